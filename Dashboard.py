@@ -1,639 +1,145 @@
 import streamlit as st
-import requests
-import websocket
+import streamlit.components.v1 as components
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import asyncio
 import json
-import threading
 import time
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta
 import base64
-from PIL import Image
-import io
-import queue
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+from utils.api_client import get_api_client, get_async_api_client
+from utils.cache import get_cache
+from utils.channel import EventChannel
+from utils.config import get_settings
+from utils.devices import DEFAULT_SORT, SORT_OPTIONS, DevicePage, parse_page, query_devices
+from utils.expiry import get_expiry_scheduler
+from utils.feedback import flush as flush_notifications, notify
+from utils.fragments import (
+    begin_app_run, in_fragment_rerun, on_fragment_rerun, rerun_for, tracked_fragment, wake_session
+)
+from utils.generator import generate_qr
+from utils.log import configure_logging, get_structured_logger
+from utils.metrics import LOGIN_STAGE_SECONDS, REGISTRY, start_metrics_server
+from utils.qr_pool import get_qr_pool
+from utils.sessions import SessionRecord, get_session_tracker
+from utils.theme import load_theme
+from utils.ws_manager import get_ws_manager
+
+# Set up logging: records are written by a background listener thread, and
+# hot paths use the structured logger so filtered-out events cost next to nothing
+configure_logging(logging.INFO)
 logger = logging.getLogger(__name__)
+events = get_structured_logger("securelink")
 
-# Configuration - FIXED WebSocket URL
-API_BASE_URL = "https://qr-auth-server.onrender.com"  # Removed trailing slash
-WS_BASE_URL = "wss://qr-auth-server.onrender.com"      # Changed to wss:// for secure WebSocket
+# Configuration - loaded once per process from securelink.toml / SECURELINK_* env vars
+settings = get_settings()
+API_BASE_URL = settings.api_base_url
+WS_BASE_URL = settings.ws_base_url
+LOGIN_STATUS_REFRESH_SECONDS = settings.login_status_refresh  # Fallback poll of the login status; socket events rerun it at once
+MESSAGE_QUEUE_SIZE = settings.message_queue_size  # Undelivered non-status WebSocket events kept per session
+DASHBOARD_EVENT_POLL_SECONDS = settings.dashboard_event_poll  # How often the dashboard picks up pushed events
 
-# Custom CSS for beautiful UI
-def load_custom_css():
-    st.markdown("""
-    <style>
-    /* Import Google Fonts */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&family=JetBrains+Mono:wght@400;500&display=swap');
-    
-    /* Global Styles */
-    .main {
-        font-family: 'Inter', sans-serif;
-        background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-        min-height: 100vh;
-    }
-    
-    /* Hide Streamlit elements */
-    .stDeployButton {display: none;}
-    header[data-testid="stHeader"] {display: none;}
-    .stMainBlockContainer {padding-top: 2rem;}
-    
-    /* Header Styles */
-    .main-header {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        padding: 3rem 2rem;
-        border-radius: 20px;
-        margin-bottom: 3rem;
-        text-align: center;
-        color: white;
-        box-shadow: 0 20px 40px rgba(102, 126, 234, 0.3);
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .main-header::before {
-        content: '';
-        position: absolute;
-        top: -50%;
-        left: -50%;
-        width: 200%;
-        height: 200%;
-        background: radial-gradient(circle, rgba(255,255,255,0.1) 0%, transparent 70%);
-        animation: float 6s ease-in-out infinite;
-    }
-    
-    @keyframes float {
-        0%, 100% { transform: translateY(0px); }
-        50% { transform: translateY(-20px); }
-    }
-    
-    .main-title {
-        font-size: 3.5rem;
-        font-weight: 700;
-        margin-bottom: 1rem;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.2);
-        position: relative;
-        z-index: 1;
-    }
-    
-    .main-subtitle {
-        font-size: 1.3rem;
-        font-weight: 300;
-        opacity: 0.95;
-        position: relative;
-        z-index: 1;
-    }
-    
-    /* QR Code Section */
-    .qr-section {
-        background: white;
-        border-radius: 24px;
-        padding: 3rem;
-        text-align: center;
-        box-shadow: 0 25px 50px rgba(0,0,0,0.1);
-        border: 1px solid #f0f0f0;
-        margin: 2rem 0;
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .qr-section::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        height: 4px;
-        background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
-    }
-    
-    .qr-title {
-        font-size: 2rem;
-        font-weight: 600;
-        color: white;
-        margin-bottom: 1rem;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        gap: 0.5rem;
-    }
-    
-    .qr-description {
-        color: #7f8c8d;
-        font-size: 1.1rem;
-        margin-bottom: 2rem;
-        line-height: 1.6;
-        max-width: 500px;
-        margin-left: auto;
-        margin-right: auto;
-    }
-    
-    .qr-container {
-        display: inline-block;
-        padding: 2rem;
-        background: linear-gradient(145deg, #f8f9fa, #e9ecef);
-        border-radius: 20px;
-        box-shadow: 
-            inset 5px 5px 10px #d1d5db,
-            inset -5px -5px 10px #ffffff,
-            0 10px 30px rgba(0,0,0,0.1);
-        margin: 2rem 0;
-        transition: transform 0.3s ease;
-    }
-    
-    .qr-container:hover {
-        transform: translateY(-5px);
-    }
-    
-    /* Status Cards */
-    .status-card {
-        border-radius: 16px;
-        padding: 1.5rem;
-        margin: 1rem 0;
-        text-align: center;
-        font-weight: 500;
-        font-size: 1.1rem;
-        box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-        transition: transform 0.3s ease;
-    }
-    
-    .status-card:hover {
-        transform: translateY(-2px);
-    }
-    
-    .status-waiting {
-        background: linear-gradient(135deg, #ffecd2 0%, #fcb69f 100%);
-        color: #8b4513;
-        border-left: 4px solid #ff9500;
-    }
-    
-    .status-success {
-        background: linear-gradient(135deg, #a8edea 0%, #fed6e3 100%);
-        color: #155724;
-        border-left: 4px solid #28a745;
-    }
-    
-    .status-error {
-        background: linear-gradient(135deg, #ff9a9e 0%, #fecfef 100%);
-        color: #721c24;
-        border-left: 4px solid #dc3545;
-    }
-    
-    /* Dashboard Styles */
-    .dashboard-card {
-        background: white;
-        border-radius: 20px;
-        padding: 2rem;
-        box-shadow: 0 15px 35px rgba(0,0,0,0.1);
-        margin: 1.5rem 0;
-        border: 1px solid #f0f0f0;
-        transition: transform 0.3s ease, box-shadow 0.3s ease;
-    }
-    
-    /*.dashboard-card:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 20px 40px rgba(0,0,0,0.15);
-    }*/
-    
-    .welcome-section {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        padding: 3rem;
-        border-radius: 20px;
-        margin-bottom: 2rem;
-        text-align: center;
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .welcome-section::before {
-        content: '';
-        position: absolute;
-        top: -50%;
-        right: -50%;
-        width: 200%;
-        height: 200%;
-        background: radial-gradient(circle, rgba(255,255,255,0.1) 0%, transparent 70%);
-        animation: float 8s ease-in-out infinite reverse;
-    }
-    
-    .welcome-title {
-        font-size: 2.5rem;
-        font-weight: 600;
-        margin-bottom: 0.5rem;
-        position: relative;
-        z-index: 1;
-    }
-    
-    .welcome-subtitle {
-        font-size: 1.2rem;
-        opacity: 0.9;
-        position: relative;
-        z-index: 1;
-    }
-    
-    .stats-grid {
-        display: grid;
-        grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-        gap: 1.5rem;
-        margin: 2rem 0;
-    }
-    
-    .stat-card {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        padding: 2rem;
-        border-radius: 16px;
-        text-align: center;
-        box-shadow: 0 10px 30px rgba(102, 126, 234, 0.3);
-        transition: transform 0.3s ease, box-shadow 0.3s ease;
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .stat-card:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 15px 40px rgba(102, 126, 234, 0.4);
-    }
-    
-    .stat-card::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: -100%;
-        width: 100%;
-        height: 100%;
-        background: linear-gradient(90deg, transparent, rgba(255,255,255,0.2), transparent);
-        animation: shimmer 3s infinite;
-    }
-    
-    @keyframes shimmer {
-        0% { left: -100%; }
-        100% { left: 100%; }
-    }
-    
-    .stat-number {
-        font-size: 2.5rem;
-        font-weight: 700;
-        margin-bottom: 0.5rem;
-        position: relative;
-        z-index: 1;
-    }
-    
-    .stat-label {
-        font-size: 1rem;
-        opacity: 0.9;
-        position: relative;
-        z-index: 1;
-    }
-    
-    /*.info-grid {
-        display: grid;
-        grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-        gap: 1rem;
-        margin: 1.5rem 0;
-    }*/
-    
-    .info-card {
-        background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%);
-        border: 2px solid #dee2e6;
-        border-radius: 12px;
-        padding: 1.5rem;
-        transition: all 0.3s ease;
-        position: relative;
-    }
-    
-    .info-card:hover {
-        border-color: #667eea;
-        transform: translateY(-3px);
-        box-shadow: 0 10px 30px rgba(102, 126, 234, 0.2);
-    }
-    
-    .info-label {
-        font-size: 0.9rem;
-        color: #6c757d;
-        font-weight: 500;
-        margin-bottom: 0.5rem;
-    }
-    
-    .info-value {
-        font-size: 1.1rem;
-        color: #2c3e50;
-        font-weight: 600;
-        font-family: 'JetBrains Mono', monospace;
-    }
-    
-    .device-list {
-        display: flex;
-        flex-direction: column;
-        gap: 1rem;
-        margin-top: 1rem;
-    }
-    
-    .device-item {
-        background: white;
-        border: 2px solid #e9ecef;
-        border-radius: 16px;
-        padding: 1.5rem;
-        box-shadow: 0 5px 15px rgba(0,0,0,0.08);
-        transition: all 0.3s ease;
-        display: flex;
-        align-items: center;
-        justify-content: space-between;
-    }
-    
-    .device-item:hover {
-        transform: translateY(-3px);
-        box-shadow: 0 10px 30px rgba(0,0,0,0.15);
-        border-color: #667eea;
-    }
-    
-    .device-info {
-        flex: 1;
-    }
-    
-    .device-name {
-        font-size: 1.3rem;
-        font-weight: 600;
-        color: #2c3e50;
-        margin-bottom: 0.5rem;
-        display: flex;
-        align-items: center;
-        gap: 0.5rem;
-    }
-    
-    .device-details {
-        color: #7f8c8d;
-        font-size: 0.9rem;
-        margin-bottom: 0.3rem;
-    }
-    
-    .device-status {
-        display: inline-block;
-        padding: 0.4rem 1rem;
-        border-radius: 20px;
-        font-size: 0.8rem;
-        font-weight: 600;
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-    }
-    
-    .status-active {
-        background: linear-gradient(135deg, #d4edda 0%, #c3e6cb 100%);
-        color: #155724;
-        border: 1px solid #c3e6cb;
-    }
-    
-    .status-inactive {
-        background: linear-gradient(135deg, #f8d7da 0%, #f5c6cb 100%);
-        color: #721c24;
-        border: 1px solid #f5c6cb;
-    }
-    
-    .device-actions {
-        display: flex;
-        gap: 0.5rem;
-        align-items: center;
-    }
-    
-    /* Button Styles */
-    .stButton > button {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border: none;
-        border-radius: 12px;
-        padding: 0.8rem 1.5rem;
-        font-weight: 600;
-        font-size: 1rem;
-        transition: all 0.3s ease;
-        box-shadow: 0 5px 15px rgba(102, 126, 234, 0.3);
-        cursor: pointer;
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 10px 25px rgba(102, 126, 234, 0.4);
-        background: linear-gradient(135deg, #5a67d8 0%, #6b46c1 100%);
-    }
-    
-    .stButton > button:active {
-        transform: translateY(0);
-        box-shadow: 0 5px 15px rgba(102, 126, 234, 0.3);
-    }
-    
-    /* Action Button Variants */
-    /*.action-grid {
-        display: grid;
-        grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-        gap: 1rem;
-        margin: 2rem 0;
-    }*/
-    
-    .action-button {
-        background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%);
-        border: 2px solid #dee2e6;
-        border-radius: 12px;
-        padding: 1.5rem;
-        text-align: center;
-        cursor: pointer;
-        transition: all 0.3s ease;
-        text-decoration: none;
-        color: #495057;
-    }
-    
-    .action-button:hover {
-        border-color: #667eea;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        transform: translateY(-5px);
-        box-shadow: 0 15px 35px rgba(102, 126, 234, 0.3);
-    }
-    
-    .action-icon {
-        font-size: 2rem;
-        margin-bottom: 0.5rem;
-        display: block;
-    }
-    
-    .action-title {
-        font-size: 1.1rem;
-        font-weight: 600;
-        margin-bottom: 0.3rem;
-    }
-    
-    .action-desc {
-        font-size: 0.9rem;
-        opacity: 0.8;
-    }
-    
-    /* Loading Animation */
-    .loading-spinner {
-        display: inline-block;
-        width: 24px;
-        height: 24px;
-        border: 3px solid rgba(102, 126, 234, 0.3);
-        border-top: 3px solid #667eea;
-        border-radius: 50%;
-        animation: spin 1s linear infinite;
-        margin-right: 10px;
-        vertical-align: middle;
-    }
-    
-    @keyframes spin {
-        0% { transform: rotate(0deg); }
-        100% { transform: rotate(360deg); }
-    }
-    
-    /* Pulse Animation */
-    .pulse {
-        animation: pulse 2s infinite;
-    }
-    
-    @keyframes pulse {
-        0% { opacity: 1; }
-        50% { opacity: 0.5; }
-        100% { opacity: 1; }
-    }
-    
-    /* Section Headers */
-    .section-header {
-        font-size: 1.8rem;
-        font-weight: 600;
-        color: #2c3e50;
-        margin-bottom: 1rem;
-        padding-bottom: 0.5rem;
-        border-bottom: 3px solid #667eea;
-        display: inline-block;
-    }
-    
-    /* Empty State */
-    .empty-state {
-        text-align: center;
-        padding: 3rem;
-        color: #7f8c8d;
-    }
-    
-    .empty-icon {
-        font-size: 4rem;
-        margin-bottom: 1rem;
-        opacity: 0.5;
-    }
-    
-    .empty-title {
-        font-size: 1.5rem;
-        font-weight: 600;
-        margin-bottom: 0.5rem;
-    }
-    
-    .empty-desc {
-        font-size: 1rem;
-        margin-bottom: 2rem;
-    }
-    
-    /* Responsive Design */
-    @media (max-width: 768px) {
-        .main-header {
-            padding: 2rem 1rem;
-        }
-        
-        .main-title {
-            font-size: 2.5rem;
-        }
-        
-        .qr-section {
-            padding: 2rem 1rem;
-        }
-        
-        .dashboard-card {
-            padding: 1.5rem;
-        }
-        
-        .stats-grid {
-            grid-template-columns: 1fr;
-        }
-        
-        .device-item {
-            flex-direction: column;
-            align-items: flex-start;
-            gap: 1rem;
-        }
-        
-        .device-actions {
-            width: 100%;
-            justify-content: flex-end;
-        }
-    }
-    
-    /* Dark mode friendly adjustments */
-    @media (prefers-color-scheme: dark) {
-        .main {
-            background: linear-gradient(135deg, #1a1a1a 0%, #2d3748 100%);
-        }
-        
-        .dashboard-card, .qr-section {
-            background: #2d3748;
-            border-color: #4a5568;
-            color: #e2e8f0;
-        }
-    }
-    </style>
-    """, unsafe_allow_html=True)
+# Instrumentation: Prometheus endpoint (loopback-only unless metrics_host says otherwise) and the in-app admin panel
+METRICS_PORT = settings.metrics_port
+METRICS_HOST = settings.metrics_host
+ADMIN_PANEL = settings.admin_panel
+
+# HTTP connection pool shared by every session of this process
+api_client = get_api_client(
+    pool_size=settings.http_pool_size,
+    retries=settings.http_retries,
+    backoff_factor=settings.http_backoff,
+    timeout=settings.http_timeout
+)
+
+# Concurrent reads for the dashboard, on the same event loop as the sockets
+async_api = get_async_api_client(
+    get_ws_manager().loop,
+    pool_size=settings.http_pool_size,
+    retries=settings.http_retries,
+    timeout=settings.http_timeout,
+    recorder=api_client
+)
+DASHBOARD_FETCH_DEADLINE = settings.dashboard_fetch_deadline  # Seconds each concurrent dashboard read may take
 
-# WebSocket Client Class with IMPROVED connection handling
+# Bulk revoke: DELETEs in flight at once, devices per batch request, and the deadline for the whole run
+BULK_REVOKE_CONCURRENCY = settings.bulk_revoke_concurrency
+BULK_REVOKE_BATCH_SIZE = settings.bulk_revoke_batch_size
+BULK_REVOKE_DEADLINE = settings.bulk_revoke_deadline
+
+# Optional server features from /capabilities, per API base URL
+capabilities_cache = get_cache("capabilities", maxsize=8, ttl=300)
+
+def _browser_connected(session_id):
+    return not Runtime.exists() or Runtime.instance().is_active_session(session_id)
+
+# Closes the sockets of tabs that were closed, and reports per-session memory
+session_tracker = get_session_tracker(
+    idle_timeout=settings.session_idle_timeout,
+    disconnect_grace=settings.session_disconnect_grace,
+    is_active=_browser_connected
+)
+
+# Device lists per session token, invalidated on revoke and device/profile events
+device_cache = get_cache("devices", maxsize=settings.device_cache_size, ttl=settings.device_cache_ttl)
+DEVICE_PAGE_SIZE = settings.device_page_size  # Devices rendered per page of the device list
+DEVICE_PAGES_PER_TOKEN = 32  # Cached search/sort/page results per session from a paginating server
+
+# Pre-generated QR sessions handed out to new visitors
+QR_POOL_SIZE = settings.qr_pool_size
+QR_POOL_MIN_TTL = settings.qr_pool_min_ttl  # Seconds a pooled session must still be valid for
+
+# Render the login QR from its session_id locally instead of decoding the server's PNG
+QR_LOCAL_RENDER = settings.qr_local_render
+
+# Close login sockets the moment their QR code expires, optionally swapping in a fresh code
+expiry_scheduler = get_expiry_scheduler(get_ws_manager().loop)
+QR_AUTO_ROTATE = settings.qr_auto_rotate
+
+# Display-ready QR image bytes per session_id, dropped when the QR code expires
+qr_image_cache = get_cache("qr_images", maxsize=settings.qr_image_cache_size)
+
+# WebSocket Client - a per-session handle on the shared connection multiplexer
 class WebSocketClient:
     def __init__(self, message_queue):
-        self.ws = None
+        self.subscription = None
         self.connected = False
         self.session_id = None
         self.token = None
         self.message_queue = message_queue
         self.running = False
-        self.connection_thread = None
-        self.reconnect_attempts = 0
-        self.max_reconnect_attempts = 5
+        self.max_reconnect_attempts = settings.ws_max_reconnect_attempts
+        self.login_started = None
+        self.ws_stage_recorded = False
+        # (browser session id, fragment id) to rerun when a login event is queued
+        self.rerun_target = None
 
-    def connect_for_login(self, session_id):
+    def connect_for_login(self, session_id, started_at=None):
+        """Open the login socket; started_at (time.monotonic) times the login stages"""
         try:
             self.session_id = session_id
+            self.login_started = started_at
             self.running = True
-            self.reconnect_attempts = 0
             ws_url = f"{WS_BASE_URL}/ws/login/{session_id}"
-            logger.info(f"🔌 Connecting to login WebSocket: {ws_url}")
-            
-            # Add headers for better compatibility with hosted services
-            headers = {
-                'User-Agent': 'StreamlitWebSocketClient/1.0'
-            }
+            events.info("ws.connect", kind="login", session_id=session_id)
             
-            self.ws = websocket.WebSocketApp(
+            self.subscription = get_ws_manager().subscribe(
                 ws_url,
-                header=headers,
                 on_message=self.on_message,
                 on_error=self.on_error,
                 on_close=self.on_close,
-                on_open=self.on_open
+                on_open=self.on_open,
+                user_agent='StreamlitWebSocketClient/1.0',
+                ping_interval=settings.ws_ping_interval,
+                ping_timeout=settings.ws_ping_timeout,
+                max_reconnect_attempts=self.max_reconnect_attempts,
+                backoff_base=settings.ws_backoff_base,
+                backoff_cap=settings.ws_backoff_cap,
+                stable_after=settings.ws_stable_after
             )
             
-            # Run in separate thread
-            def run_ws():
-                try:
-                    # Increased ping interval for better stability on hosted services
-                    self.ws.run_forever(
-                        ping_interval=60,
-                        ping_timeout=30,
-                        ping_payload="ping"
-                    )
-                except Exception as e:
-                    logger.error(f"❌ WebSocket run_forever error: {e}")
-                    if self.running and self.reconnect_attempts < self.max_reconnect_attempts:
-                        self.reconnect_attempts += 1
-                        logger.info(f"🔄 Attempting reconnection {self.reconnect_attempts}/{self.max_reconnect_attempts}")
-                        time.sleep(5)  # Wait before reconnecting
-                        self.connect(session_id)  # Recursive reconnection
-            
-            self.connection_thread = threading.Thread(target=run_ws, daemon=True)
-            self.connection_thread.start()
-            
         except Exception as e:
             logger.error(f"❌ WebSocket connection error: {str(e)}")
             self.message_queue.put({"type": "error", "message": str(e)})
@@ -643,43 +149,55 @@ class WebSocketClient:
         try:
             self.token = token
             self.running = True
-            self.reconnect_attempts = 0
             ws_url = f"{WS_BASE_URL}/ws/listen?token={token}"
-            logger.info(f"🔌 Connecting to user WebSocket: {ws_url}")
+            events.info("ws.connect", kind="user")
 
-            self.ws = websocket.WebSocketApp(
+            self.subscription = get_ws_manager().subscribe(
                 ws_url,
                 on_message=self.on_message,
                 on_error=self.on_error,
                 on_close=self.on_close,
-                on_open=self.on_open
+                on_open=self.on_open,
+                ping_interval=settings.ws_ping_interval,
+                ping_timeout=settings.ws_ping_timeout,
+                max_reconnect_attempts=self.max_reconnect_attempts,
+                backoff_base=settings.ws_backoff_base,
+                backoff_cap=settings.ws_backoff_cap,
+                stable_after=settings.ws_stable_after
             )
 
-            def run_ws():
-                self.ws.run_forever(ping_interval=60, ping_timeout=30)
-
-            self.connection_thread = threading.Thread(target=run_ws, daemon=True)
-            self.connection_thread.start()
-
         except Exception as e:
             logger.error(f"❌ WebSocket connection error: {str(e)}")
             self.message_queue.put({"type": "error", "message": str(e)})
     
-    def on_open(self, ws):
+    def wake_owner(self):
+        """Rerun the page that shows this client's events, if one asked to be woken"""
+        target = self.rerun_target
+        if target is not None:
+            wake_session(*target)
+
+    def _push(self, message):
+        self.message_queue.put(message)
+        self.wake_owner()
+
+    # Callbacks below run on the multiplexer's event loop and must not block
+    def on_open(self, subscription):
+        if self.login_started is not None and not self.ws_stage_recorded:
+            LOGIN_STAGE_SECONDS.observe(time.monotonic() - self.login_started, stage="ws_connected")
+            self.ws_stage_recorded = True
         self.connected = True
-        self.reconnect_attempts = 0  # Reset reconnection counter on successful connection
-        logger.info("✅ WebSocket connected successfully")
-        self.message_queue.put({"type": "ws_connected", "message": "WebSocket connected"})
+        events.info("ws.open", session_id=self.session_id)
+        self._push({"type": "ws_connected", "message": "WebSocket connected"})
         
         # Send a ping to keep connection alive
         try:
-            ws.send("ping")
+            subscription.send("ping")
         except Exception as e:
             logger.error(f"❌ Error sending initial ping: {e}")
     
-    def on_message(self, ws, message):
+    def on_message(self, subscription, message):
         try:
-            logger.info(f"📨 WebSocket message received: {message}")
+            events.debug("ws.frame", size=len(message), sample=0.1)
             
             # Handle echo and ping messages
             if message.startswith("Echo:") or message == "pong":
@@ -688,11 +206,13 @@ class WebSocketClient:
             # Try to parse as JSON
             try:
                 data = json.loads(message)
-                logger.info(f"📨 Parsed WebSocket data: {data}")
+                events.debug("ws.message", type=data.get('type'), rate=20)
                 
                 if data.get('type') == 'login_success':
                     logger.info("🎉 Login success message received!")
-                    self.message_queue.put({
+                    if self.login_started is not None:
+                        LOGIN_STAGE_SECONDS.observe(time.monotonic() - self.login_started, stage="login_success")
+                    self._push({
                         "type": "login_success",
                         "user_data": data.get('user'),
                         "session_token": data.get('session_token'),
@@ -706,42 +226,40 @@ class WebSocketClient:
                         "session_token": data.get('access_token')
                     })
                 elif data.get('type') == 'connected':
-                    logger.info("🔌 WebSocket connection confirmed")
-                    self.message_queue.put({"type": "ws_confirmed", "message": "Connection confirmed"})
+                    events.debug("ws.confirmed", session_id=self.session_id)
+                    self._push({"type": "ws_confirmed", "message": "Connection confirmed"})
                 else:
                     self.message_queue.put(data)
             except json.JSONDecodeError:
                 # Handle plain text messages
-                logger.info(f"📨 Plain text message: {message}")
+                events.debug("ws.text", size=len(message), rate=20)
                 self.message_queue.put({"type": "message", "content": message})
                 
         except Exception as e:
             logger.error(f"❌ Error processing WebSocket message: {e}")
     
-    def on_error(self, ws, error):
+    def on_error(self, subscription, error):
         logger.error(f"❌ WebSocket error: {error}")
-        self.message_queue.put({"type": "error", "message": str(error)})
+        self._push({"type": "error", "message": str(error)})
     
-    def on_close(self, ws, close_status_code, close_msg):
+    def on_close(self, subscription, close_status_code, close_msg):
+        # Reconnection is owned by the multiplexer task, not by this callback
         self.connected = False
-        logger.info(f"🔌 WebSocket closed: {close_status_code} - {close_msg}")
-        self.message_queue.put({"type": "disconnected", "code": close_status_code, "message": close_msg})
-        
-        # Attempt reconnection if we're still supposed to be running
-        if self.running and self.reconnect_attempts < self.max_reconnect_attempts:
-            self.reconnect_attempts += 1
-            logger.info(f"🔄 Attempting reconnection {self.reconnect_attempts}/{self.max_reconnect_attempts}")
-            time.sleep(3)
-            if self.session_id:
-                self.connect_for_login(self.session_id)
-            elif self.token:
-                self.connect_for_user(self.token)
+        events.info("ws.close", code=close_status_code, reason=close_msg, rate=10)
+        self._push({"type": "disconnected", "code": close_status_code, "message": close_msg})
+
+    def is_alive(self):
+        """True while the multiplexer still owns a connection task for this client"""
+        return self.running and self.subscription is not None and self.subscription.alive
 
     def disconnect(self):
         self.running = False
-        if self.ws:
+        self.connected = False
+        # Its page has moved on; late close events mustn't rerun it
+        self.rerun_target = None
+        if self.subscription:
             try:
-                self.ws.close()
+                self.subscription.close()
             except Exception as e:
                 logger.error(f"❌ Error closing WebSocket: {e}")
 
@@ -749,7 +267,7 @@ class WebSocketClient:
 def generate_qr_session():
     try:
         logger.info("🎯 Generating QR session...")
-        response = requests.post(f"{API_BASE_URL}/qr/generate", json={}, timeout=10)
+        response = api_client.post(f"{API_BASE_URL}/qr/generate", endpoint="POST /qr/generate", json={})
         if response.status_code == 200:
             data = response.json()
             logger.info(f"✅ QR session generated: {data['session_id']}")
@@ -761,25 +279,240 @@ def generate_qr_session():
         logger.error(f"❌ Connection error: {str(e)}")
         return None
 
-def get_user_devices(token):
+def _device_query(offset=0, limit=None, search="", sort=DEFAULT_SORT):
+    return (offset, limit or DEVICE_PAGE_SIZE, search.strip(), sort)
+
+def _cached_devices(token, query):
+    # Per token: either the full list (None key) from a server that doesn't
+    # paginate, or the pages fetched so far keyed by query
+    pages = device_cache.get(token)
+    if pages is None:
+        return None
+    if None in pages:
+        offset, limit, search, sort = query
+        return query_devices(pages[None].items, search, sort, offset, limit)
+    return pages.get(query)
+
+def _devices_request(token, query):
+    offset, limit, search, sort = query
+    params = {"offset": offset, "limit": limit, "sort": SORT_OPTIONS.get(sort, SORT_OPTIONS[DEFAULT_SORT])[0]}
+    if search:
+        params["q"] = search
+    return {"headers": {"Authorization": f"Bearer {token}"}, "params": params}
+
+def _store_devices(token, query, payload):
+    offset, limit, search, sort = query
+    page = parse_page(payload, offset, limit)
+    pages = device_cache.get(token)
+    if pages is None:
+        pages = {}
+        device_cache.set(token, pages)
+    if page.limit is None:
+        pages.clear()
+        pages[None] = page
+        return query_devices(page.items, search, sort, offset, limit)
+    while len(pages) >= DEVICE_PAGES_PER_TOKEN:
+        del pages[next(iter(pages))]
+    pages[query] = page
+    return page
+
+def get_user_devices(token, offset=0, limit=None, search="", sort=DEFAULT_SORT):
+    """One page of the user's devices, filtered and sorted by the server when it paginates"""
+    query = _device_query(offset, limit, search, sort)
+    page = _cached_devices(token, query)
+    if page is not None:
+        return page
     try:
-        headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(f"{API_BASE_URL}/devices", headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        return []
+        response = api_client.get(f"{API_BASE_URL}/devices", endpoint="GET /devices", **_devices_request(token, query))
+        if response.status_code != 200:
+            return DevicePage([], 0, query[0], query[1])
+        return _store_devices(token, query, response.json())
     except:
-        return []
+        return DevicePage([], 0, query[0], query[1])
+
+async def fetch_user_devices(token, query):
+    """The /devices response for query, fetched on the async client; raises on an error status.
+
+    Parsing and caching are left to the script thread (see _store_devices), so
+    the shared event loop only does I/O.
+    """
+    response = await async_api.get(f"{API_BASE_URL}/devices", endpoint="GET /devices", **_devices_request(token, query))
+    response.raise_for_status()
+    return response
 
 def revoke_device(token, device_id):
     try:
         headers = {"Authorization": f"Bearer {token}"}
-        response = requests.delete(f"{API_BASE_URL}/devices/{device_id}", headers=headers, timeout=10)
-        return response.status_code == 200
+        response = api_client.delete(f"{API_BASE_URL}/devices/{device_id}", endpoint="DELETE /devices/{id}", headers=headers)
+        if response.status_code == 200:
+            device_cache.invalidate(token)
+            return True
+        return False
     except:
         return False
 
+async def get_server_capabilities():
+    """Optional features the server advertises at /capabilities; empty if it has none"""
+    capabilities = capabilities_cache.get(API_BASE_URL)
+    if capabilities is not None:
+        return capabilities
+    try:
+        response = await async_api.get(f"{API_BASE_URL}/capabilities", endpoint="GET /capabilities")
+        capabilities = response.json() if response.status_code == 200 else {}
+    except Exception as e:
+        logger.warning(f"⚠️ Capability probe failed: {e}")
+        return {}
+    capabilities_cache.set(API_BASE_URL, capabilities)
+    return capabilities
+
+async def _revoke_batch(token, device_ids, results):
+    # A batch that fails outright fails only its own devices, not the whole run
+    try:
+        response = await async_api.post(
+            f"{API_BASE_URL}/devices/revoke", endpoint="POST /devices/revoke",
+            headers={"Authorization": f"Bearer {token}"}, json={"device_ids": device_ids}
+        )
+        if response.status_code != 200:
+            results.update((device_id, f"HTTP {response.status_code}") for device_id in device_ids)
+            return
+        statuses = response.json().get("results", {})
+    except Exception as e:
+        results.update((device_id, type(e).__name__) for device_id in device_ids)
+        return
+    results.update((device_id, statuses.get(device_id, "no result")) for device_id in device_ids)
+
+async def _revoke_one(token, device_id, limiter, results):
+    async with limiter:
+        try:
+            response = await async_api.delete(
+                f"{API_BASE_URL}/devices/{device_id}", endpoint="DELETE /devices/{id}",
+                headers={"Authorization": f"Bearer {token}"}
+            )
+        except Exception as e:
+            results[device_id] = type(e).__name__
+            return
+        results[device_id] = "revoked" if response.status_code == 200 else f"HTTP {response.status_code}"
+
+async def revoke_devices_async(token, device_ids, results=None):
+    """Revoke many devices: batch requests if the server supports them, else bounded parallel DELETEs.
+
+    Fills and returns results as {device_id: status}, where status is
+    "revoked" on success. Each status lands as soon as its request finishes,
+    so a caller that cancels the run still knows which devices were done.
+    """
+    results = {} if results is None else results
+    capabilities = await get_server_capabilities()
+    if capabilities.get("bulk_revoke"):
+        batch_size = min(BULK_REVOKE_BATCH_SIZE, capabilities.get("max_batch") or BULK_REVOKE_BATCH_SIZE)
+        batches = [device_ids[i:i + batch_size] for i in range(0, len(device_ids), batch_size)]
+        await asyncio.gather(*(_revoke_batch(token, batch, results) for batch in batches))
+    else:
+        limiter = asyncio.Semaphore(BULK_REVOKE_CONCURRENCY)
+        await asyncio.gather(*(_revoke_one(token, device_id, limiter, results) for device_id in device_ids))
+    return results
+
+def revoke_devices(token, device_ids):
+    """Blocking wrapper around revoke_devices_async; invalidates the device cache once at the end"""
+    device_ids = list(device_ids)
+    results = {}
+    outcome = async_api.run_all(
+        {"revoke": (revoke_devices_async(token, device_ids, results), BULK_REVOKE_DEADLINE)},
+        timeout=BULK_REVOKE_DEADLINE + 1
+    )["revoke"]
+    device_cache.invalidate(token)
+    if isinstance(outcome, Exception):
+        # Devices that finished before the deadline keep their real status
+        reason = "timed out" if isinstance(outcome, asyncio.TimeoutError) else type(outcome).__name__
+        unfinished = [device_id for device_id in device_ids if device_id not in results]
+        logger.error(f"❌ Bulk revoke stopped with {len(unfinished)} device(s) unfinished: {outcome!r}")
+        return {device_id: results.get(device_id, reason) for device_id in device_ids}
+    return results
+
+def login_qr_image(record, qr_code_data=None):
+    """PNG bytes of the login QR code, decoded or rendered once per session_id.
+
+    qr_code_data is the server's base64 image, only at hand when the session
+    is first claimed; afterwards the cached bytes are used, or on a cache miss
+    a local render or the copy the record kept when QR_LOCAL_RENDER is off.
+    """
+    image = qr_image_cache.get(record.session_id)
+    if image is None:
+        image = _build_login_qr_image(record, qr_code_data)
+        ttl = record.seconds_left()
+        if ttl > 0:
+            qr_image_cache.set(record.session_id, image, ttl=ttl)
+    return image
+
+def _build_login_qr_image(record, qr_code_data):
+    if not QR_LOCAL_RENDER:
+        # Never render behind the setting's back: the server's image is the only one
+        qr_code_data = qr_code_data or record.qr_code_data
+        if not qr_code_data:
+            raise ValueError("the server sent no QR image and local rendering is off")
+        return base64.b64decode(qr_code_data)
+    try:
+        # Login codes are single-use: qr_image_cache keeps them until expiry, the
+        # generator's long-lived content cache shouldn't hold them as well
+        return generate_qr(record.qr_payload or record.session_id, cache=False)
+    except ImportError:
+        if not qr_code_data:
+            raise
+        logger.warning("⚠️ qrcode not installed, falling back to the server QR image")
+    return base64.b64decode(qr_code_data)
+
 # UI Components
+def schedule_login_expiry(record, ws_client, channel):
+    """Close the login socket exactly at expires_at and tell the status fragment"""
+    def expire():
+        channel.put({'type': 'qr_expired', 'session_id': record.session_id})
+        ws_client.wake_owner()
+        ws_client.disconnect()
+    expiry_scheduler.schedule(record.session_id, record.expires_at, expire)
+
+def discard_login_session():
+    """Forget the current QR code: cancel its expiry timer, close its socket and clear its state"""
+    record = st.session_state.get('session_record')
+    if record is not None:
+        expiry_scheduler.cancel(record.session_id)
+    if st.session_state.get('ws_client'):
+        st.session_state.ws_client.disconnect()
+    for key in ['session_record', 'ws_client', 'message_queue', 'login_success', 'user_data', 'ws_connected', 'ws_confirmed', 'ws_error']:
+        if key in st.session_state:
+            del st.session_state[key]
+
+# Runs in a same-origin component iframe and ticks every "Expires in" label on
+# the page once a second, so the status fragment only reruns to pick up socket
+# events. Each label counts down from the seconds left when it was rendered,
+# which keeps the browser's clock out of it.
+_COUNTDOWN_SCRIPT = """<script>
+(function () {
+  const doc = window.parent.document;
+  function tick() {
+    doc.querySelectorAll("[data-expires-in]").forEach((label) => {
+      if (!label.dataset.deadline) {
+        label.dataset.deadline = Date.now() + Number(label.dataset.expiresIn) * 1000;
+      }
+      const left = Math.max(0, Math.ceil((Number(label.dataset.deadline) - Date.now()) / 1000));
+      label.textContent = left > 0 ? `⏱️ Expires in ${Math.floor(left / 60)}m ${left % 60}s` : "⏰ Expired";
+    });
+  }
+  tick();
+  setInterval(tick, 1000);
+})();
+</script>"""
+
+def render_countdown_ticker():
+    # The script never changes, so reruns keep the same iframe and its timer
+    components.html(_COUNTDOWN_SCRIPT, height=0)
+
+def render_qr_expired():
+    st.markdown("""
+    <div class="status-card status-error">
+        <strong>⏰ QR Code Expired</strong><br>
+        This QR code has expired for security. Please generate a new one.
+    </div>
+    """, unsafe_allow_html=True)
+
 def render_header():
     st.markdown("""
     <div class="main-header">
@@ -805,194 +538,223 @@ def render_qr_login_page():
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
         if st.button("🔄 Generate New QR Code", use_container_width=True, help="Generate a fresh QR code"):
-            # Properly disconnect existing WebSocket
-            if hasattr(st.session_state, 'ws_client') and st.session_state.ws_client:
-                st.session_state.ws_client.disconnect()
-            
-            # Clear existing data
-            for key in ['qr_data', 'ws_client', 'message_queue', 'login_success', 'user_data', 'session_token', 'ws_connected', 'ws_confirmed']:
-                if key in st.session_state:
-                    del st.session_state[key]
+            discard_login_session()
             st.rerun()
     
+    # An expired code is swapped for a fresh one straight away when auto-rotating
+    record = st.session_state.get('session_record')
+    if QR_AUTO_ROTATE and record is not None and record.seconds_left() <= 0:
+        discard_login_session()
+    
     # Initialize message queue if not exists
     if 'message_queue' not in st.session_state:
-        st.session_state.message_queue = queue.Queue()
-    
-    # Generate QR code if not exists
-    if 'qr_data' not in st.session_state or st.session_state.qr_data is None:
-        with st.spinner("🔄 Generating secure QR code..."):
-            qr_data = generate_qr_session()
-            if qr_data:
-                st.session_state.qr_data = qr_data
-                st.session_state.login_success = False
-                st.session_state.ws_connected = False
-                st.session_state.ws_confirmed = False
-                
-                # Initialize WebSocket connection with improved error handling
-                logger.info("🔌 Initializing WebSocket connection...")
-                try:
-                    ws_client = WebSocketClient(st.session_state.message_queue)
-                    ws_client.connect_for_login(qr_data['session_id'])
-                    st.session_state.ws_client = ws_client
-                    
-                    # Wait a moment for connection
-                    time.sleep(2)
-                    st.rerun()
-                except Exception as ws_error:
-                    logger.error(f"❌ WebSocket initialization error: {ws_error}")
-                    st.error(f"❌ WebSocket connection failed: {ws_error}")
-            else:
-                st.error("❌ Failed to generate QR code. Please check your server connection.")
-                return
+        st.session_state.message_queue = EventChannel(maxsize=MESSAGE_QUEUE_SIZE)
+    
+    # Take a QR code from the warm pool, falling back to generating one
+    if st.session_state.get('session_record') is None:
+        login_started = time.monotonic()
+        qr_data = get_qr_pool(generate_qr_session, size=QR_POOL_SIZE, min_ttl=QR_POOL_MIN_TTL).acquire()
+        if not qr_data:
+            with st.spinner("🔄 Generating secure QR code..."):
+                qr_data = generate_qr_session()
+        if qr_data:
+            LOGIN_STAGE_SECONDS.observe(time.monotonic() - login_started, stage="qr_ready")
+            # Keep only the compact record; the image goes to the QR image cache
+            record = SessionRecord.from_qr_session(qr_data, keep_image=not QR_LOCAL_RENDER)
+            login_qr_image(record, qr_data.get('qr_code_data'))
+            st.session_state.session_record = record
+            st.session_state.login_success = False
+            st.session_state.ws_connected = False
+            st.session_state.ws_confirmed = False
+            
+            # Initialize WebSocket connection; its status is picked up by the status fragment
+            logger.info("🔌 Initializing WebSocket connection...")
+            try:
+                ws_client = WebSocketClient(st.session_state.message_queue)
+                ws_client.connect_for_login(record.session_id, started_at=login_started)
+                st.session_state.ws_client = ws_client
+                attach_session_resources()
+                schedule_login_expiry(record, ws_client, st.session_state.message_queue)
+            except Exception as ws_error:
+                logger.error(f"❌ WebSocket initialization error: {ws_error}")
+                st.error(f"❌ WebSocket connection failed: {ws_error}")
+        else:
+            st.error("❌ Failed to generate QR code. Please check your server connection.")
+            return
     
-    if 'qr_data' in st.session_state and st.session_state.qr_data:
-        qr_data = st.session_state.qr_data
+    record = st.session_state.get('session_record')
+    if record:
         
         # Display QR Code in beautiful container
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
             st.markdown('<div class="qr-container">', unsafe_allow_html=True)
             
-            # Decode base64 QR code
             try:
-                qr_image_data = base64.b64decode(qr_data['qr_code_data'])
-                qr_image = Image.open(io.BytesIO(qr_image_data))
-                st.image(qr_image, width=300, caption="Scan with your mobile device")
+                st.image(login_qr_image(record), width=300, caption="Scan with your mobile device")
             except Exception as e:
                 st.error(f"❌ Error displaying QR code: {e}")
                 return
             
             st.markdown('</div>', unsafe_allow_html=True)
         
-        # Process WebSocket messages - IMPROVED VERSION
-        messages_processed = 0
-        max_messages_per_cycle = 10  # Prevent infinite loops
-        
-        try:
-            while not st.session_state.message_queue.empty() and messages_processed < max_messages_per_cycle:
-                message = st.session_state.message_queue.get_nowait()
-                messages_processed += 1
-                logger.info(f"📨 Processing message #{messages_processed} from queue: {message}")
+        # The countdown ticks in the browser and the status card reruns when the
+        # socket queues an event; the page reruns only on login or expiry, and an
+        # expired code gets a static notice instead of the status fragment
+        if record.seconds_left() > 0:
+            render_countdown_ticker()
+            render_login_status()
+        else:
+            render_qr_expired()
+
+@st.fragment(run_every=LOGIN_STATUS_REFRESH_SECONDS)
+def render_login_status():
+    """Drain WebSocket events and redraw the status card without rerunning the page.
+
+    The login socket reruns this fragment as soon as it queues an event (see
+    WebSocketClient.wake_owner); LOGIN_STATUS_REFRESH_SECONDS is only a slow
+    fallback. The countdown in the card is kept current by render_countdown_ticker().
+    """
+    record = st.session_state.get('session_record')
+    if not record:
+        return
+
+    ws_client = st.session_state.get('ws_client')
+    ctx = get_script_run_ctx()
+    if ws_client is not None and ctx is not None:
+        ws_client.rerun_target = (ctx.session_id, ctx.current_fragment_id)
+
+    # Process WebSocket messages pushed by WebSocketClient.on_message
+    try:
+        for message in st.session_state.message_queue.drain():
+            events.debug("login.event", type=message.get('type'), rate=20)
+            
+            message_type = message.get('type')
+            
+            if message_type == 'login_success':
+                logger.info("🎉 Login success detected, updating session state...")
+                st.session_state.login_success = True
+                st.session_state.user_data = message.get('user_data')
+                record.token = message.get('session_token')
+                record.device_id = message.get('device_id')
                 
-                message_type = message.get('type')
+                # Redirect straight away; a toast on the dashboard confirms it
+                expiry_scheduler.cancel(record.session_id)
+                if hasattr(st.session_state, 'ws_client') and st.session_state.ws_client:
+                    st.session_state.ws_client.disconnect()
+                notify("Login successful", icon="🎉")
+                st.rerun()
                 
-                if message_type == 'login_success':
-                    logger.info("🎉 Login success detected, updating session state...")
-                    st.session_state.login_success = True
-                    st.session_state.user_data = message.get('user_data')
-                    st.session_state.session_token = message.get('session_token')
-                    st.session_state.device_id = message.get('device_id')
-                    
-                    # Show success message and redirect
-                    st.success("🎉 Authentication successful! Redirecting to dashboard...")
-                    if hasattr(st.session_state, 'ws_client') and st.session_state.ws_client:
-                        st.session_state.ws_client.disconnect()
-                    time.sleep(2)
-                    st.rerun()
-                    
-                elif message_type == 'ws_connected':
-                    st.session_state.ws_connected = True
-                    logger.info("🔌 WebSocket connection status updated")
-                    
-                elif message_type == 'ws_confirmed':
-                    st.session_state.ws_confirmed = True
-                    logger.info("🔌 WebSocket connection confirmed")
-                    
-                elif message_type == 'error':
-                    st.error(f"❌ Connection Error: {message.get('message')}")
-                    
-                elif message_type == 'disconnected':
-                    st.session_state.ws_connected = False
-                    st.warning("🔌 Connection interrupted. Attempting to reconnect...")
-                    
-        except queue.Empty:
-            pass
-        except Exception as e:
-            logger.error(f"❌ Error processing messages: {e}")
-        
-        # Display status with improved UI
-        expires_at = datetime.fromisoformat(qr_data['expires_at'].replace('Z', '+00:00'))
-        time_left = expires_at - datetime.now(timezone.utc)
+            elif message_type == 'qr_expired':
+                # The scheduler already closed the socket; a full run swaps this
+                # fragment for a fresh QR code or the expired notice
+                logger.info(f"⏰ QR session {record.session_id} expired")
+                if QR_AUTO_ROTATE:
+                    discard_login_session()
+                st.rerun()
+                
+            elif message_type == 'ws_connected':
+                st.session_state.ws_connected = True
+                st.session_state.ws_error = None
+                
+            elif message_type == 'ws_confirmed':
+                st.session_state.ws_confirmed = True
+                
+            elif message_type == 'error':
+                st.session_state.ws_error = message.get('message')
+                
+            elif message_type == 'disconnected':
+                st.session_state.ws_connected = False
+                
+    except Exception as e:
+        logger.error(f"❌ Error processing messages: {e}")
+
+    if st.session_state.get('ws_error'):
+        st.error(f"❌ Connection Error: {st.session_state.ws_error}")
+    
+    # Display status with improved UI
+    time_left = record.seconds_left()
+    
+    if time_left > 0:
+        minutes_left = int(time_left // 60)
+        seconds_left = int(time_left % 60)
         
-        if time_left.total_seconds() > 0:
-            minutes_left = int(time_left.total_seconds() // 60)
-            seconds_left = int(time_left.total_seconds() % 60)
-            
-            # Enhanced WebSocket status
-            if st.session_state.get('ws_connected', False):
-                if st.session_state.get('ws_confirmed', False):
-                    status_icon = "✅"
-                    status_text = "Connected & Ready"
-                    status_class = "status-success"
-                else:
-                    status_icon = "🔄"
-                    status_text = "Connected (Confirming...)"
-                    status_class = "status-waiting"
-            elif hasattr(st.session_state, 'ws_client'):
+        # Enhanced WebSocket status
+        if st.session_state.get('ws_connected', False):
+            if st.session_state.get('ws_confirmed', False):
+                status_icon = "✅"
+                status_text = "Connected & Ready"
+                status_class = "status-success"
+            else:
                 status_icon = "🔄"
-                status_text = "Connecting..."
+                status_text = "Connected (Confirming...)"
                 status_class = "status-waiting"
-            else:
-                status_icon = "❌"
-                status_text = "Disconnected"
-                status_class = "status-error"
-            
-            st.markdown(f"""
-            <div class="status-card {status_class}">
-                <div class="loading-spinner pulse"></div>
-                <strong>{status_icon} {status_text}</strong><br>
-                Waiting for device authentication...<br>
-                <small>⏱️ Expires in {minutes_left}m {seconds_left}s</small>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Auto-refresh every 3 seconds for better stability
-            time.sleep(3)
-            st.rerun()
+        elif hasattr(st.session_state, 'ws_client') and st.session_state.ws_client.is_alive():
+            status_icon = "🔄"
+            status_text = "Connecting..."
+            status_class = "status-waiting"
         else:
-            st.markdown("""
-            <div class="status-card status-error">
-                <strong>⏰ QR Code Expired</strong><br>
-                This QR code has expired for security. Please generate a new one.
-            </div>
-            """, unsafe_allow_html=True)
+            status_icon = "❌"
+            status_text = "Disconnected"
+            status_class = "status-error"
+        
+        st.markdown(f"""
+        <div class="status-card {status_class}">
+            <div class="loading-spinner pulse"></div>
+            <strong>{status_icon} {status_text}</strong><br>
+            Waiting for device authentication...<br>
+            <small data-expires-in="{int(time_left)}">⏱️ Expires in {minutes_left}m {seconds_left}s</small>
+        </div>
+        """, unsafe_allow_html=True)
+    else:
+        render_qr_expired()
 
-def render_dashboard():
-    user_data = st.session_state.user_data
-    session_token = st.session_state.session_token
-    
-    # Initialize WebSocket for user updates if not connected
-    if 'ws_client' not in st.session_state or not st.session_state.ws_client.connected:
-        ws_client = WebSocketClient(st.session_state.message_queue)
-        ws_client.connect_for_user(session_token)
-        st.session_state.ws_client = ws_client
+# Dashboard data each pushed event changes, for re-running only the fragments that show it
+DASHBOARD_EVENT_DEPS = {
+    'profile_updated': ('user_data', 'devices'),
+    'device': ('devices',),  # device_linked / device_revoked etc. pushed by the server
+}
 
-    # Process WebSocket messages
-    try:
-        while not st.session_state.message_queue.empty():
-            message = st.session_state.message_queue.get_nowait()
-            if message.get('type') == 'profile_updated':
-                st.session_state.user_data = message.get('user_data')
-                st.session_state.session_token = message.get('session_token')
-                st.rerun()
-    except queue.Empty:
-        pass
+def apply_dashboard_event(message):
+    """Update session state for a pushed event; returns the dependencies it changed"""
+    message_type = message.get('type') or ''
+    record = st.session_state.session_record
+    session_token = record.token
+    if message_type == 'profile_updated':
+        device_cache.invalidate(session_token)
+        st.session_state.user_data = message.get('user_data')
+        record.token = message.get('session_token')
+        return DASHBOARD_EVENT_DEPS['profile_updated']
+    if message_type.startswith('device'):
+        device_cache.invalidate(session_token)
+        return DASHBOARD_EVENT_DEPS['device']
+    return ()
 
-    logger.info(f"🎯 Rendering dashboard for user: {user_data}")
-    
-    # Welcome Section
+@st.fragment(run_every=DASHBOARD_EVENT_POLL_SECONDS)
+def watch_dashboard_events():
+    """Drain pushed events and rerun only the fragments whose data they changed"""
+    if 'message_queue' not in st.session_state:
+        return
+    changed = set()
+    for message in st.session_state.message_queue.drain():
+        changed.update(apply_dashboard_event(message))
+    if changed:
+        rerun_for(*changed)
+
+@tracked_fragment('user_data')
+def render_welcome():
+    user_data = st.session_state.user_data
     st.markdown(f"""
     <div class="welcome-section">
         <div class="welcome-title">Welcome back, {user_data['username']}! 👋</div>
         <div class="welcome-subtitle">Your secure authentication session is active</div>
     </div>
     """, unsafe_allow_html=True)
-    
-    # Get user devices for stats
-    devices = get_user_devices(session_token)
-    active_devices = devices
-    login_time = datetime.now().strftime("%H:%M")
+
+@tracked_fragment('devices')
+def render_stats():
+    device_total = get_user_devices(st.session_state.session_record.token).total
+    login_time = st.session_state.setdefault('login_time', datetime.now().strftime("%H:%M"))
     
     # Stats Section
     st.markdown("""
@@ -1005,7 +767,7 @@ def render_dashboard():
     with col1:
         st.markdown(f"""
         <div class="stat-card">
-            <div class="stat-number">{len(active_devices)}</div>
+            <div class="stat-number">{device_total}</div>
             <div class="stat-label">📱 Active Devices</div>
         </div>
         """, unsafe_allow_html=True)
@@ -1025,6 +787,10 @@ def render_dashboard():
             <div class="stat-label">✅ Secure</div>
         </div>
         """, unsafe_allow_html=True)
+
+@tracked_fragment('user_data')
+def render_user_info():
+    user_data = st.session_state.user_data
     
     # User Information Section
     st.markdown("""
@@ -1067,7 +833,57 @@ def render_dashboard():
             <div class="info-value">✅ Active</div>
         </div>
         """, unsafe_allow_html=True)
-    
+
+def _set_device_page(page):
+    st.session_state.device_page = page
+
+def _reset_device_page():
+    st.session_state.device_page = 0
+
+def _select_devices(devices, selected):
+    # Selection is kept by device_id (with the name, for the results report) across pages
+    selection = st.session_state.setdefault('device_selection', {})
+    for device in devices:
+        if selected:
+            selection[device.device_id] = device.device_name
+        else:
+            selection.pop(device.device_id, None)
+        st.session_state[f"select_{device.device_id}"] = selected
+
+def _on_device_checkbox(device):
+    _select_devices([device], st.session_state[f"select_{device.device_id}"])
+
+def _clear_device_selection():
+    for device_id in st.session_state.get('device_selection', {}):
+        st.session_state.pop(f"select_{device_id}", None)
+    st.session_state.device_selection = {}
+
+def render_bulk_revoke_report(report):
+    if report['revoked']:
+        st.success(f"✅ Revoked {len(report['revoked'])} device(s)")
+    if report['failed']:
+        st.error(f"❌ {len(report['failed'])} device(s) could not be revoked")
+        with st.expander("Failed devices"):
+            st.dataframe([{"device": name, "result": status} for name, status in report['failed']], hide_index=True)
+
+def bulk_revoke_selected(session_token):
+    """Revoke every selected device in one pass, then rerun once"""
+    selection = st.session_state.get('device_selection', {})
+    with st.spinner(f"Revoking {len(selection)} device(s)..."):
+        results = revoke_devices(session_token, selection)
+    revoked = [device_id for device_id, status in results.items() if status == "revoked"]
+    st.session_state.bulk_revoke_report = {
+        'revoked': [selection[device_id] for device_id in revoked],
+        'failed': [(selection[device_id], status) for device_id, status in results.items() if status != "revoked"],
+    }
+    logger.info(f"🗑️ Bulk revoke: {len(revoked)} of {len(results)} device(s) revoked")
+    for device_id in revoked:
+        selection.pop(device_id, None)
+        st.session_state.pop(f"select_{device_id}", None)
+    rerun_for('devices')
+
+@tracked_fragment('devices')
+def render_device_list():
     # Linked Devices Section
     st.markdown("""
     <div class="dashboard-card">
@@ -1075,16 +891,38 @@ def render_dashboard():
     </div>
     """, unsafe_allow_html=True)
     
-    if devices:
-        for device in devices:
+    # Search, sort and paging widgets only rerun this fragment
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        search = st.text_input("Search devices", key="device_search", placeholder="🔍 Search by name or device ID",
+                               label_visibility="collapsed", on_change=_reset_device_page)
+    with col2:
+        sort = st.selectbox("Sort devices", list(SORT_OPTIONS), key="device_sort",
+                            label_visibility="collapsed", on_change=_reset_device_page)
+    bulk_mode = st.toggle("Select multiple", key="device_bulk_mode", help="Select devices to revoke in one go")
+    
+    report = st.session_state.pop('bulk_revoke_report', None)
+    if report:
+        render_bulk_revoke_report(report)
+    
+    session_token = st.session_state.session_record.token
+    page_number = st.session_state.get('device_page', 0)
+    page = get_user_devices(session_token, offset=page_number * DEVICE_PAGE_SIZE, search=search, sort=sort)
+    page_count = max(1, -(-page.total // DEVICE_PAGE_SIZE))
+    if page_number >= page_count:
+        # The list shrank (revoked devices, narrower search) past the current page
+        _set_device_page(page_count - 1)
+        page_number = page_count - 1
+        page = get_user_devices(session_token, offset=page_number * DEVICE_PAGE_SIZE, search=search, sort=sort)
+    
+    if page.items:
+        # Only the visible page is rendered, whatever the account's device count
+        for device in page.items:
             st.write("")
             status_class = "status-active"
             status_text = "Active"
             status_icon = "🟢"
             
-            created_date = datetime.fromisoformat(device['created_at']).strftime("%b %d, %Y at %H:%M")
-            last_active = datetime.fromisoformat(device['last_active']).strftime("%b %d, %Y at %H:%M")
-            
             # Create device item
             col1, col2 = st.columns([4, 1])
             
@@ -1093,24 +931,57 @@ def render_dashboard():
                 <div class="device-item">
                     <div class="device-info">
                         <div class="device-name">
-                            {status_icon} {device['device_name']}
+                            {status_icon} {device.device_name}
                         </div>
-                        <div class="device-details">📅 Created: {created_date}</div>
-                        <div class="device-details">🕒 Last Active: {last_active}</div>
+                        <div class="device-details">📅 Created: {device.created_label}</div>
+                        <div class="device-details">🕒 Last Active: {device.last_active_label}</div>
                         <div class="device-status {status_class}">{status_text}</div>
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
             
             with col2:
-                if st.button(f"🗑️ Revoke", key=f"revoke_{device['id']}", help="Revoke device access", use_container_width=True):
-                    with st.spinner("Revoking device..."):
-                        if revoke_device(session_token, device['device_id']):
-                            st.success("✅ Device revoked successfully!")
-                            time.sleep(1)
-                            st.rerun()
-                        else:
-                            st.error("❌ Failed to revoke device")
+                if bulk_mode:
+                    key = f"select_{device.device_id}"
+                    if key not in st.session_state:
+                        st.session_state[key] = device.device_id in st.session_state.get('device_selection', {})
+                    st.checkbox("Select", key=key, on_change=_on_device_checkbox, args=(device,))
+                elif st.button(f"🗑️ Revoke", key=f"revoke_{device.id}", help="Revoke device access", use_container_width=True):
+                    if revoke_device(session_token, device.device_id):
+                        notify(f"Revoked {device.device_name}", icon="✅")
+                        rerun_for('devices')
+                    else:
+                        st.error("❌ Failed to revoke device")
+        
+        if bulk_mode:
+            selected_count = len(st.session_state.get('device_selection', {}))
+            st.write("")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.button("☑️ Select page", key="device_select_page", on_click=_select_devices,
+                          args=(page.items, True), use_container_width=True)
+            with col2:
+                st.button("✖️ Clear selection", key="device_clear_selection", disabled=selected_count == 0,
+                          on_click=_clear_device_selection, use_container_width=True)
+            with col3:
+                if st.button(f"🗑️ Revoke {selected_count} selected", key="device_bulk_revoke", type="primary",
+                             disabled=selected_count == 0, use_container_width=True):
+                    bulk_revoke_selected(session_token)
+        
+        if page_count > 1:
+            st.write("")
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                st.button("◀ Previous", key="device_page_prev", disabled=page_number == 0,
+                          on_click=_set_device_page, args=(page_number - 1,), use_container_width=True)
+            with col2:
+                first = page_number * DEVICE_PAGE_SIZE + 1
+                st.caption(f"Page {page_number + 1} of {page_count} · devices {first}–{first + len(page.items) - 1} of {page.total}")
+            with col3:
+                st.button("Next ▶", key="device_page_next", disabled=page_number >= page_count - 1,
+                          on_click=_set_device_page, args=(page_number + 1,), use_container_width=True)
+    elif search.strip():
+        st.info(f"No devices match \"{search.strip()}\"")
     else:
         st.markdown("""
         <div class="empty-state">
@@ -1119,7 +990,9 @@ def render_dashboard():
             <div class="empty-desc">You haven't linked any devices yet. Scan a QR code to get started!</div>
         </div>
         """, unsafe_allow_html=True)
-    
+
+@tracked_fragment()
+def render_quick_actions():
     # Quick Actions Section
     st.markdown("""
     <div class="dashboard-card">
@@ -1133,9 +1006,9 @@ def render_dashboard():
     
     with col1:
         if st.button("🔄 Refresh Data", use_container_width=True, help="Refresh device list and user data"):
-            with st.spinner("Refreshing..."):
-                time.sleep(1)
-                st.rerun()
+            device_cache.invalidate(st.session_state.session_record.token)
+            notify("Device list refreshed", icon="🔄")
+            rerun_for('devices')
     
     with col2:
         if st.button("📱 Link New Device", use_container_width=True, help="Generate new QR code to link another device"):
@@ -1144,7 +1017,7 @@ def render_dashboard():
                 st.session_state.ws_client.disconnect()
             
             # Reset to QR generation
-            for key in ['qr_data', 'ws_client', 'message_queue', 'login_success', 'user_data', 'session_token', 'ws_connected', 'ws_confirmed']:
+            for key in ['session_record', 'ws_client', 'message_queue', 'login_success', 'user_data', 'ws_connected', 'ws_confirmed', 'ws_error', 'login_time', 'device_page', 'device_search', 'device_sort', 'device_bulk_mode', 'device_selection']:
                 if key in st.session_state:
                     del st.session_state[key]
             st.rerun()
@@ -1155,14 +1028,119 @@ def render_dashboard():
             if hasattr(st.session_state, 'ws_client') and st.session_state.ws_client:
                 st.session_state.ws_client.disconnect()
             
-            # Clear session with confirmation
-            with st.spinner("Signing out..."):
-                time.sleep(1)
-                for key in list(st.session_state.keys()):
-                    del st.session_state[key]
-                st.success("✅ Signed out successfully!")
-                time.sleep(1)
-                st.rerun()
+            # Clear session; the confirmation shows as a toast on the login page
+            for key in list(st.session_state.keys()):
+                del st.session_state[key]
+            notify("Signed out successfully", icon="✅")
+            st.rerun()
+
+def prefetch_dashboard_data():
+    """Fetch the dashboard's uncached reads concurrently, so the fragments render from cache.
+
+    The stats card reads the first default page and the device list the page
+    it is on; on the first page with no search or sort they are the same read,
+    and a single read has nothing to overlap with, so the fragment fetching it
+    itself is just as fast. Only two or more missing reads go out as a batch.
+    """
+    token = st.session_state.session_record.token
+    queries = {
+        _device_query(),  # stats card
+        _device_query(
+            offset=st.session_state.get('device_page', 0) * DEVICE_PAGE_SIZE,
+            search=st.session_state.get('device_search', ''),
+            sort=st.session_state.get('device_sort', DEFAULT_SORT)
+        ),
+    }
+    missing = [query for query in queries if _cached_devices(token, query) is None]
+    if len(missing) < 2:
+        return
+    calls = {query: (fetch_user_devices(token, query), DASHBOARD_FETCH_DEADLINE) for query in missing}
+    # Future profile/activity reads go in the same batch; a call that fails or
+    # misses its deadline is simply fetched again by the fragment that needs it
+    try:
+        results = async_api.run_all(calls, timeout=DASHBOARD_FETCH_DEADLINE + 1)
+    except Exception as e:
+        logger.warning(f"⚠️ Dashboard prefetch failed: {e}")
+        return
+    # Parsed and cached here on the script thread: responses that missed the
+    # batch deadline are never stored, and the event loop stays free for sockets
+    for query, result in results.items():
+        try:
+            if isinstance(result, Exception):
+                raise result
+            _store_devices(token, query, result.json())
+        except Exception as e:
+            events.warning("dashboard.prefetch_failed", query=query, error=repr(e), rate=1)
+
+def render_dashboard():
+    # Initialize WebSocket for user updates if not connected
+    if 'ws_client' not in st.session_state or not st.session_state.ws_client.is_alive():
+        ws_client = WebSocketClient(st.session_state.message_queue)
+        ws_client.connect_for_user(st.session_state.session_record.token)
+        st.session_state.ws_client = ws_client
+        attach_session_resources()
+
+    events.debug("dashboard.render", user_id=st.session_state.user_data.get('id'), rate=5)
+    prefetch_dashboard_data()
+
+    # Each section is a fragment: widgets and pushed events re-execute only the
+    # sections whose data changed instead of the whole page
+    watch_dashboard_events()
+    render_welcome()
+    render_stats()
+    render_user_info()
+    render_device_list()
+    render_quick_actions()
+
+def render_admin_panel():
+    """Connection health and latency figures for operators, in the sidebar"""
+    with st.sidebar:
+        st.markdown("### 📊 SecureLink Metrics")
+        col1, col2 = st.columns(2)
+        col1.metric("Open sockets", get_ws_manager().active_count())
+        col2.metric("Pooled QR codes", len(get_qr_pool(generate_qr_session, size=QR_POOL_SIZE, min_ttl=QR_POOL_MIN_TTL)))
+        if 'message_queue' in st.session_state:
+            st.caption("This session's event channel")
+            st.json(st.session_state.message_queue.stats())
+        st.caption(f"Browser sessions ({len(session_tracker)})")
+        sessions = session_tracker.report()
+        if sessions:
+            st.dataframe(sessions, hide_index=True)
+        st.caption("API latency")
+        latency = api_client.latency_report()
+        if latency:
+            st.dataframe([{"endpoint": endpoint, **stats} for endpoint, stats in latency.items()], hide_index=True)
+        with st.expander("Prometheus exposition"):
+            st.code(REGISTRY.render(), language="text")
+
+def touch_session():
+    """Heartbeat for the session reaper, on every run a user action caused"""
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return
+    page = "dashboard" if st.session_state.get('login_success') else "login"
+    if session_tracker.heartbeat(ctx.session_id, page, st.session_state):
+        reset_reaped_session()
+        if in_fragment_rerun():
+            st.rerun()
+
+def attach_session_resources():
+    """Let the reaper see a socket opened after this run's heartbeat"""
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        session_tracker.attach(ctx.session_id, st.session_state.get('ws_client'), st.session_state.get('message_queue'))
+
+def reset_reaped_session():
+    """Drop what the reaper released: the dead socket and, on the login page, the stale QR code"""
+    for key in ['ws_client', 'ws_connected', 'ws_confirmed', 'ws_error']:
+        st.session_state.pop(key, None)
+    if not st.session_state.get('login_success'):
+        discard_login_session()
+    # The dashboard reconnects its user socket on this run
+
+# Fragment-only reruns skip main(), so they do its per-run bookkeeping themselves
+on_fragment_rerun(flush_notifications)
+on_fragment_rerun(touch_session)
 
 # Main App
 def main():
@@ -1173,8 +1151,20 @@ def main():
         initial_sidebar_state="collapsed"
     )
     
-    # Load custom CSS
-    load_custom_css()
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT, host=METRICS_HOST)
+    
+    # Stylesheet from static/, fetched once per browser rather than resent every rerun
+    load_theme()
+    
+    # Toasts queued by the action that triggered this rerun
+    flush_notifications()
+    
+    # Fragments register their data dependencies afresh on every full run
+    begin_app_run()
+    
+    # Report in to the session tracker; a session it reaped while idle starts over
+    touch_session()
     
     # Initialize session state
     if 'login_success' not in st.session_state:
@@ -1192,6 +1182,9 @@ def main():
     else:
         render_qr_login_page()
     
+    if ADMIN_PANEL:
+        render_admin_panel()
+    
     # Footer
     st.markdown("""
     <div style="text-align: center; padding: 2rem; color: #7f8c8d; font-size: 0.9rem; margin-top: 3rem;">
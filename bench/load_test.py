@@ -0,0 +1,208 @@
+import argparse
+import logging
+import os
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+DRIVER_PREFIX = "bench-driver"
+
+
+def start_stand_in(port, qr_latency, login_delay):
+    """Run the stand-in server in its own process so it doesn't skew our numbers"""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "bench.stand_in_server", "--port", str(port),
+         "--qr-latency", str(qr_latency), "--login-delay", str(login_delay)],
+        cwd=REPO_ROOT,
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError("stand-in server exited during startup")
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("stand-in server did not start listening")
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def open_sockets():
+    """Sockets held by this process (Linux /proc only; None elsewhere)"""
+    try:
+        fds = os.listdir("/proc/self/fd")
+    except OSError:
+        return None
+    count = 0
+    for fd in fds:
+        try:
+            count += os.readlink(f"/proc/self/fd/{fd}").startswith("socket:")
+        except OSError:
+            pass
+    return count
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Peak rather than current RSS, but better than nothing off Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def client_threads():
+    """Threads other than the harness's own session drivers"""
+    return sum(1 for t in threading.enumerate() if not t.name.startswith(DRIVER_PREFIX))
+
+
+class Sampler:
+    """Records peak threads, sockets and RSS while the run is in progress"""
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.peak = {"threads": 0, "sockets": 0, "rss_mb": 0.0}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"{DRIVER_PREFIX}-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+
+    def sample(self):
+        self.peak["threads"] = max(self.peak["threads"], client_threads())
+        self.peak["sockets"] = max(self.peak["sockets"], open_sockets() or 0)
+        self.peak["rss_mb"] = max(self.peak["rss_mb"], rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+
+def run_session(app, timeout, dashboard):
+    """One simulated visitor, following the same steps as the Streamlit pages"""
+    started = time.monotonic()
+    qr_data = app.get_qr_pool(app.generate_qr_session, size=app.QR_POOL_SIZE, min_ttl=app.QR_POOL_MIN_TTL).acquire()
+    if not qr_data:
+        qr_data = app.generate_qr_session()
+    if not qr_data:
+        return {"error": "qr"}
+    result = {"qr": time.monotonic() - started}
+    record = app.SessionRecord.from_qr_session(qr_data, keep_image=not app.QR_LOCAL_RENDER)
+    app.login_qr_image(record, qr_data.get('qr_code_data'))
+
+    channel = app.EventChannel(maxsize=app.MESSAGE_QUEUE_SIZE)
+    client = app.WebSocketClient(channel)
+    client.connect_for_login(qr_data['session_id'], started_at=started)
+    deadline = started + timeout
+    login = None
+    try:
+        while login is None and time.monotonic() < deadline:
+            for message in channel.drain():
+                if message.get('type') == 'login_success':
+                    login = message
+            time.sleep(0.01)
+    finally:
+        client.disconnect()
+    if login is None:
+        return {**result, "error": "login timeout"}
+    result["login"] = time.monotonic() - started
+
+    if dashboard:
+        token = login['session_token']
+        fetch_started = time.monotonic()
+        app.get_user_devices(token)
+        result["devices"] = time.monotonic() - fetch_started
+        app.get_user_devices(token)
+    return result
+
+
+def report(label, values):
+    if not values:
+        return f"{label:<18} n/a"
+    return (f"{label:<18} p50 {percentile(values, 50) * 1000:8.1f} ms   "
+            f"p99 {percentile(values, 99) * 1000:8.1f} ms   max {max(values) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive concurrent QR logins through Dashboard.py's client code.")
+    parser.add_argument("-n", "--sessions", type=int, default=200, help="concurrent simulated login sessions")
+    parser.add_argument("--server", default=None, help="existing server base URL (default: start a stand-in)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--qr-latency", type=float, default=0.05)
+    parser.add_argument("--login-delay", type=float, default=1.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--http-pool-size", type=int, default=None, help="override SECURELINK_HTTP_POOL_SIZE")
+    parser.add_argument("--no-dashboard", action="store_true", help="stop after login_success")
+    args = parser.parse_args()
+
+    server = None
+    if args.server is None:
+        server = start_stand_in(args.port, args.qr_latency, args.login_delay)
+        base_url = f"http://127.0.0.1:{args.port}"
+    else:
+        base_url = args.server.rstrip("/")
+
+    # Point the app's configuration at the server under test before it loads
+    os.environ["SECURELINK_API_BASE_URL"] = base_url
+    os.environ.pop("SECURELINK_WS_BASE_URL", None)
+    os.environ.pop("SECURELINK_ENDPOINTS", None)
+    if args.http_pool_size:
+        os.environ["SECURELINK_HTTP_POOL_SIZE"] = str(args.http_pool_size)
+    import Dashboard as app
+    logging.getLogger().setLevel(logging.WARNING)
+
+    try:
+        return run(app, args, base_url)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+def run(app, args, base_url):
+    baseline = {"threads": client_threads(), "sockets": open_sockets(), "rss_mb": rss_mb()}
+    started = time.monotonic()
+    with Sampler() as sampler, ThreadPoolExecutor(args.sessions, thread_name_prefix=DRIVER_PREFIX) as pool:
+        results = list(pool.map(lambda _: run_session(app, args.timeout, not args.no_dashboard), range(args.sessions)))
+    elapsed = time.monotonic() - started
+
+    errors = [r["error"] for r in results if "error" in r]
+    print(f"{args.sessions} sessions against {base_url} in {elapsed:.2f}s ({len(errors)} failed)")
+    print(report("time-to-QR", [r["qr"] for r in results if "qr" in r]))
+    print(report("time-to-login", [r["login"] for r in results if "login" in r]))
+    if not args.no_dashboard:
+        print(report("device fetch", [r["devices"] for r in results if "devices" in r]))
+    print(f"{'threads':<18} baseline {baseline['threads']:>6}   peak {sampler.peak['threads']:>6}")
+    print(f"{'sockets':<18} baseline {baseline['sockets']!s:>6}   peak {sampler.peak['sockets']:>6}")
+    print(f"{'rss':<18} baseline {baseline['rss_mb']:6.1f} MB   peak {sampler.peak['rss_mb']:6.1f} MB")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from bench.stand_in_server import Script, StandInServer, start  # noqa: E402
+from utils.ws_manager import get_ws_manager  # noqa: E402
+
+
+def serve(script, port):
+    """Run a stand-in server with script on a background loop until the process exits"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="stand-in", daemon=True).start()
+    asyncio.run_coroutine_threadsafe(start(StandInServer(script), port=port), loop).result(10)
+    return f"ws://127.0.0.1:{port}"
+
+
+class Recorder:
+    """Collects a subscription's callbacks, in order"""
+
+    def __init__(self):
+        self.events = []
+
+    def on_open(self, subscription):
+        self.events.append(("open",))
+
+    def on_message(self, subscription, message):
+        self.events.append(("message", message))
+
+    def on_close(self, subscription, code, reason):
+        self.events.append(("close", code, reason))
+
+    def on_error(self, subscription, error):
+        self.events.append(("error", repr(error)))
+
+    def subscribe(self, url, **kwargs):
+        return get_ws_manager().subscribe(
+            url, on_message=self.on_message, on_open=self.on_open, on_close=self.on_close,
+            on_error=self.on_error, **kwargs
+        )
+
+
+def run_until_done(subscription, timeout):
+    deadline = time.monotonic() + timeout
+    while subscription.alive and time.monotonic() < deadline:
+        time.sleep(0.05)
+    still_alive = subscription.alive
+    subscription.close()
+    return still_alive
+
+
+def check_server_close(port):
+    """A policy close by the server reaches on_close with its code and reason, and isn't retried"""
+    base_url = serve(Script(socket_close_code=1008), port)
+    recorder = Recorder()
+    subscription = recorder.subscribe(f"{base_url}/ws/login/check", max_reconnect_attempts=5, backoff_base=0.05)
+    assert not run_until_done(subscription, 5), "subscription kept reconnecting after a 1008 close"
+    closes = [event for event in recorder.events if event[0] == "close"]
+    errors = [event for event in recorder.events if event[0] == "error"]
+    assert not errors, f"server close surfaced as an error: {errors}"
+    assert closes == [("close", 1008, "rejected by stand-in")], f"unexpected close events: {recorder.events}"
+
+
+def check_no_reconnect_storm(port):
+    """A server that accepts and drops every socket uses up the reconnect budget instead of resetting it"""
+    base_url = serve(Script(socket_close_code=1011), port)
+    recorder = Recorder()
+    subscription = recorder.subscribe(f"{base_url}/ws/listen?token=check", max_reconnect_attempts=3,
+                                      backoff_base=0.05)
+    assert not run_until_done(subscription, 10), f"still reconnecting after {len(recorder.events) // 2} connections"
+    opens = recorder.events.count(("open",))
+    assert opens == 4, f"expected 1 connection + 3 reconnects, got {opens} connections"
+
+
+CHECKS = [check_server_close, check_no_reconnect_storm]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check socket lifecycle handling against a stand-in server.")
+    parser.add_argument("--port", type=int, default=8766, help="first port; each check serves on its own")
+    args = parser.parse_args()
+
+    failed = 0
+    for offset, check in enumerate(CHECKS):
+        try:
+            check(args.port + offset)
+            print(f"ok    {check.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL  {check.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+import argparse
+import asyncio
+import json
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from aiohttp import WSMsgType, web
+
+
+class Script:
+    """Latencies (seconds) and pushes the stand-in server plays back"""
+
+    def __init__(self, qr_latency=0.05, devices_latency=0.02, revoke_latency=0.02, jitter=0.2,
+                 qr_ttl=300, device_count=3, login_delay=1.0, confirm_delay=0.05, profile_interval=None,
+                 paginate_devices=True, bulk_revoke=True, socket_close_code=None):
+        self.qr_latency = qr_latency
+        self.devices_latency = devices_latency
+        self.revoke_latency = revoke_latency
+        self.jitter = jitter
+        self.qr_ttl = qr_ttl
+        self.device_count = device_count
+        self.login_delay = login_delay
+        self.confirm_delay = confirm_delay
+        self.profile_interval = profile_interval
+        # When false, /devices ignores limit/offset/q/sort and returns a bare list like older servers
+        self.paginate_devices = paginate_devices
+        # When false, /capabilities is absent and clients must revoke one DELETE at a time
+        self.bulk_revoke = bulk_revoke
+        # When set, sockets are accepted and then closed straight away with this code,
+        # like a server rejecting an expired token or an unknown login session
+        self.socket_close_code = socket_close_code
+
+    async def wait(self, seconds):
+        if seconds:
+            await asyncio.sleep(seconds * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _user(token):
+    user_id = abs(hash(token)) % 100000
+    return {"id": user_id, "username": f"bench-user-{user_id}", "email": f"user{user_id}@bench.local"}
+
+
+class StandInServer:
+    """Just enough of the QR auth server API for benchmarking the client"""
+
+    def __init__(self, script=None):
+        self.script = script or Script()
+        self.devices = {}
+        self.counts = {"qr_generate": 0, "devices": 0, "revoke": 0, "bulk_revoke": 0, "login_sockets": 0,
+                       "user_sockets": 0}
+        self.app = web.Application()
+        self.app.add_routes([
+            web.post("/qr/generate", self.qr_generate),
+            web.get("/devices", self.list_devices),
+            web.delete("/devices/{device_id}", self.revoke_device),
+            web.get("/capabilities", self.capabilities),
+            web.post("/devices/revoke", self.bulk_revoke),
+            web.get("/ws/login/{session_id}", self.login_socket),
+            web.get("/ws/listen", self.user_socket),
+        ])
+
+    def _token(self, request):
+        return request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+
+    def _devices_for(self, token):
+        if token not in self.devices:
+            created = _now() - timedelta(days=1)
+            self.devices[token] = [
+                {
+                    "id": index,
+                    "device_id": f"device-{uuid.uuid4().hex[:12]}",
+                    "device_name": f"Bench Phone {index}",
+                    "created_at": (created + timedelta(minutes=index)).replace(tzinfo=None).isoformat(),
+                    "last_active": _now().replace(tzinfo=None).isoformat(),
+                }
+                for index in range(self.script.device_count)
+            ]
+        return self.devices[token]
+
+    async def qr_generate(self, request):
+        self.counts["qr_generate"] += 1
+        await self.script.wait(self.script.qr_latency)
+        expires_at = _now() + timedelta(seconds=self.script.qr_ttl)
+        return web.json_response({
+            "session_id": uuid.uuid4().hex,
+            "expires_at": expires_at.isoformat().replace("+00:00", "Z"),
+        })
+
+    async def list_devices(self, request):
+        self.counts["devices"] += 1
+        await self.script.wait(self.script.devices_latency)
+        token = self._token(request)
+        if not token:
+            return web.json_response({"detail": "Not authenticated"}, status=401)
+        devices = self._devices_for(token)
+        if not self.script.paginate_devices or "limit" not in request.query:
+            return web.json_response(devices)
+        try:
+            offset = max(0, int(request.query.get("offset", 0)))
+            limit = max(1, min(200, int(request.query["limit"])))
+        except ValueError:
+            return web.json_response({"detail": "offset and limit must be integers"}, status=422)
+        needle = request.query.get("q", "").casefold()
+        if needle:
+            devices = [d for d in devices if needle in d["device_name"].casefold() or needle in d["device_id"]]
+        sort = request.query.get("sort", "-last_active")
+        field = sort.lstrip("-")
+        if field in ("last_active", "created_at", "device_name"):
+            devices = sorted(devices, key=lambda d: d[field], reverse=sort.startswith("-"))
+        return web.json_response({"items": devices[offset:offset + limit], "total": len(devices), "offset": offset})
+
+    async def revoke_device(self, request):
+        self.counts["revoke"] += 1
+        await self.script.wait(self.script.revoke_latency)
+        devices = self._devices_for(self._token(request))
+        device_id = request.match_info["device_id"]
+        remaining = [d for d in devices if d["device_id"] != device_id]
+        if len(remaining) == len(devices):
+            return web.json_response({"detail": "Device not found"}, status=404)
+        devices[:] = remaining
+        return web.json_response({"detail": "Device revoked"})
+
+    async def capabilities(self, request):
+        if not self.script.bulk_revoke:
+            raise web.HTTPNotFound()
+        return web.json_response({"bulk_revoke": True, "max_batch": 500})
+
+    async def bulk_revoke(self, request):
+        if not self.script.bulk_revoke:
+            raise web.HTTPNotFound()
+        self.counts["bulk_revoke"] += 1
+        await self.script.wait(self.script.revoke_latency)
+        device_ids = (await request.json()).get("device_ids", [])
+        devices = self._devices_for(self._token(request))
+        known = {d["device_id"] for d in devices}
+        devices[:] = [d for d in devices if d["device_id"] not in device_ids]
+        return web.json_response({"results": {
+            device_id: "revoked" if device_id in known else "not_found" for device_id in device_ids
+        }})
+
+    async def _pong(self, ws):
+        async for message in ws:
+            if message.type == WSMsgType.TEXT and message.data == "ping":
+                await ws.send_str("pong")
+
+    async def _reject(self, ws):
+        await ws.close(code=self.script.socket_close_code, message=b"rejected by stand-in")
+        return ws
+
+    async def login_socket(self, request):
+        self.counts["login_sockets"] += 1
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        if self.script.socket_close_code:
+            return await self._reject(ws)
+        reader = asyncio.create_task(self._pong(ws))
+        try:
+            await self.script.wait(self.script.confirm_delay)
+            await ws.send_str(json.dumps({"type": "connected"}))
+            await self.script.wait(self.script.login_delay)
+            token = uuid.uuid4().hex
+            await ws.send_str(json.dumps({
+                "type": "login_success",
+                "user": _user(token),
+                "session_token": token,
+                "device_id": f"device-{uuid.uuid4().hex[:12]}",
+            }))
+            await reader
+        finally:
+            reader.cancel()
+        return ws
+
+    async def user_socket(self, request):
+        self.counts["user_sockets"] += 1
+        token = request.query.get("token", "")
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        if self.script.socket_close_code:
+            return await self._reject(ws)
+        reader = asyncio.create_task(self._pong(ws))
+        try:
+            await ws.send_str(json.dumps({"type": "connected"}))
+            while self.script.profile_interval and not ws.closed:
+                await self.script.wait(self.script.profile_interval)
+                await ws.send_str(json.dumps({"type": "profile_updated", "user": _user(token), "access_token": token}))
+            await reader
+        finally:
+            reader.cancel()
+        return ws
+
+
+async def start(server, host="127.0.0.1", port=8765):
+    """Start serving on the running loop; returns the aiohttp AppRunner"""
+    runner = web.AppRunner(server.app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the QR auth server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--qr-latency", type=float, default=0.05)
+    parser.add_argument("--devices-latency", type=float, default=0.02)
+    parser.add_argument("--login-delay", type=float, default=1.0, help="seconds before login_success is pushed")
+    parser.add_argument("--profile-interval", type=float, default=None, help="push profile_updated this often")
+    parser.add_argument("--device-count", type=int, default=3)
+    parser.add_argument("--qr-ttl", type=float, default=300, help="seconds until a generated QR code expires")
+    parser.add_argument("--no-device-pagination", action="store_true", help="return /devices as one bare list")
+    parser.add_argument("--no-bulk-revoke", action="store_true", help="don't advertise or serve POST /devices/revoke")
+    parser.add_argument("--close-sockets", type=int, default=None, metavar="CODE",
+                        help="accept every socket, then close it at once with this close code")
+    args = parser.parse_args()
+
+    script = Script(qr_latency=args.qr_latency, devices_latency=args.devices_latency, login_delay=args.login_delay,
+                    profile_interval=args.profile_interval, device_count=args.device_count, qr_ttl=args.qr_ttl,
+                    paginate_devices=not args.no_device_pagination, bulk_revoke=not args.no_bulk_revoke,
+                    socket_close_code=args.close_sockets)
+    web.run_app(StandInServer(script).app, host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
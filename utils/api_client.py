@@ -0,0 +1,215 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+from collections import deque
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.metrics import HTTP_ERRORS, HTTP_REQUEST_SECONDS
+
+
+# Rolling latency figures for one endpoint
+class LatencyStats:
+    def __init__(self, window=500):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=window)
+
+    def record(self, elapsed, ok=True):
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.samples.append(elapsed)
+        if not ok:
+            self.errors += 1
+
+    def percentile(self, pct):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50) * 1000, 2),
+            "p95_ms": round(self.percentile(95) * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+class ApiClient:
+    """Keep-alive HTTP client shared by every Streamlit session of the process.
+
+    All threads share one HTTPAdapter, so they draw from a single pool of warm
+    connections, while each thread gets its own requests.Session (and cookie
+    jar) because Session itself is not thread-safe.
+    """
+
+    def __init__(self, pool_size=20, retries=3, backoff_factor=0.3, timeout=10):
+        self.timeout = timeout
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET", "DELETE"}),
+            raise_on_status=False,
+        )
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        self._local = threading.local()
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", self.adapter)
+            session.mount("http://", self.adapter)
+            self._local.session = session
+        return session
+
+    def request(self, method, url, endpoint=None, **kwargs):
+        """Send a request over the pool, recording its latency under endpoint"""
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = self.session.request(method, url, **kwargs)
+            ok = response.status_code < 500
+            return response
+        finally:
+            self.record(endpoint or f"{method} {url}", time.perf_counter() - start, ok)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def record(self, endpoint, elapsed, ok):
+        HTTP_REQUEST_SECONDS.observe(elapsed, endpoint=endpoint)
+        if not ok:
+            HTTP_ERRORS.inc(endpoint=endpoint)
+        with self._stats_lock:
+            stats = self._stats.get(endpoint)
+            if stats is None:
+                stats = self._stats[endpoint] = LatencyStats()
+            stats.record(elapsed, ok)
+
+    def latency_report(self):
+        """Per-endpoint latency summary, e.g. {"GET /devices": {"p50_ms": ...}}"""
+        with self._stats_lock:
+            return {endpoint: stats.summary() for endpoint, stats in self._stats.items()}
+
+
+class AsyncApiClient:
+    """httpx.AsyncClient living on a background event loop, for issuing reads concurrently.
+
+    Script threads hand it a batch of coroutines through run_all() and wait
+    for the whole batch, so a page waits for its slowest call rather than the
+    sum of them. Latencies land in the same report as the requests client.
+    """
+
+    def __init__(self, loop, pool_size=20, retries=3, timeout=10, recorder=None):
+        self.loop = loop
+        self.timeout = timeout
+        self.recorder = recorder
+        self._limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        self._retries = retries
+        self._client = None
+
+    @property
+    def client(self):
+        # Created on first use from the loop thread: httpx binds its pool to that loop
+        if self._client is None:
+            # Transport-level retries cover failed connects only, not 5xx responses
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                transport=httpx.AsyncHTTPTransport(limits=self._limits, retries=self._retries),
+            )
+        return self._client
+
+    async def request(self, method, url, endpoint=None, **kwargs):
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            ok = response.status_code < 500
+            return response
+        finally:
+            if self.recorder is not None:
+                self.recorder.record(endpoint or f"{method} {url}", time.perf_counter() - start, ok)
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def delete(self, url, **kwargs):
+        return await self.request("DELETE", url, **kwargs)
+
+    async def _bounded(self, coroutine, timeout):
+        try:
+            return await asyncio.wait_for(coroutine, timeout)
+        except Exception as e:
+            return e
+
+    async def _gather(self, calls):
+        results = await asyncio.gather(*(self._bounded(coroutine, timeout) for coroutine, timeout in calls.values()))
+        return dict(zip(calls, results))
+
+    def run_all(self, calls, timeout=None):
+        """Run {name: (coroutine, deadline_seconds)} concurrently; blocks the calling thread.
+
+        Returns {name: result}, where a call that failed or missed its
+        deadline maps to the exception instead (asyncio.TimeoutError for a
+        missed deadline). timeout bounds the whole batch.
+        """
+        if not calls:
+            return {}
+        future = asyncio.run_coroutine_threadsafe(self._gather(calls), self.loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+
+_client = None
+_client_lock = threading.Lock()
+_async_client = None
+
+
+def get_api_client(**kwargs):
+    """Return the process-wide ApiClient; kwargs only apply when it is first created"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ApiClient(**kwargs)
+    return _client
+
+
+def get_async_api_client(loop, **kwargs):
+    """Return the process-wide AsyncApiClient on loop; kwargs only apply when it is first created"""
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                _async_client = AsyncApiClient(loop, **kwargs)
+    return _async_client
@@ -0,0 +1,134 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from utils.scanner import scan_qr
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff", ".webp")
+
+ScanResult = namedtuple("ScanResult", ["source", "payload", "seconds", "error"])
+
+
+def iter_image_paths(directory, recursive=True):
+    """Yield image file paths under directory lazily, in directory order"""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    yield from iter_image_paths(entry.path, recursive)
+            elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                yield entry.path
+
+
+def _labelled(sources):
+    # Paths label themselves; buffers are labelled by position unless given as (label, data)
+    for index, source in enumerate(sources):
+        label = index
+        if isinstance(source, tuple):
+            label, source = source
+        elif isinstance(source, (str, os.PathLike)):
+            label = os.fspath(source)
+        if isinstance(source, memoryview):
+            # Buffers are pickled to the workers, and memoryviews can't be
+            source = source.tobytes()
+        yield label, source
+
+
+def _error(e):
+    return f"{type(e).__name__}: {e}"
+
+
+def _scan_one(source):
+    start = time.perf_counter()
+    try:
+        payload, error = scan_qr(source), None
+    except Exception as e:
+        payload, error = None, _error(e)
+    return payload, time.perf_counter() - start, error
+
+
+def scan_batch(sources, workers=None, max_in_flight=None):
+    """Scan many images across a process pool, yielding ScanResults as they finish.
+
+    sources is a directory or image path, or an iterable of paths, buffers or
+    (label, buffer) pairs. It is consumed lazily and at most max_in_flight
+    images (default: twice the worker count) are queued at once, which bounds
+    memory when streaming large folders or frame dumps. An image that can't
+    be scanned, or sent to a worker, yields a ScanResult with error set
+    instead of ending the batch.
+    """
+    if isinstance(sources, (str, os.PathLike)):
+        sources = iter_image_paths(sources) if os.path.isdir(sources) else [sources]
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 2
+    pending = {}
+    labelled = _labelled(sources)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_in_flight:
+                try:
+                    label, source = next(labelled)
+                except StopIteration:
+                    exhausted = True
+                    break
+                try:
+                    pending[pool.submit(_scan_one, source)] = label
+                except Exception as e:
+                    # The pool broke (a worker died); report the rest instead of raising
+                    yield ScanResult(label, None, 0.0, _error(e))
+            if not pending:
+                continue
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                label = pending.pop(future)
+                try:
+                    payload, seconds, error = future.result()
+                except Exception as e:
+                    # Unpicklable source, or a worker that crashed mid-scan
+                    payload, seconds, error = None, 0.0, _error(e)
+                yield ScanResult(label, payload, seconds, error)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Decode every QR code image under a directory.")
+    parser.add_argument("paths", nargs="+", help="image files or directories to scan")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="images queued at once (default: 2 x workers)")
+    parser.add_argument("--no-recursive", action="store_true", help="do not descend into subdirectories")
+    parser.add_argument("--json", action="store_true", help="print one JSON record per image")
+    args = parser.parse_args(argv)
+
+    def sources():
+        for path in args.paths:
+            if os.path.isdir(path):
+                yield from iter_image_paths(path, recursive=not args.no_recursive)
+            else:
+                yield path
+
+    start = time.perf_counter()
+    scanned = decoded = failed = 0
+    for result in scan_batch(sources(), workers=args.workers, max_in_flight=args.max_in_flight):
+        scanned += 1
+        decoded += result.payload is not None
+        failed += result.error is not None
+        if args.json:
+            print(json.dumps(result._asdict()))
+        else:
+            outcome = result.payload if result.payload is not None else (result.error or "QR code not found")
+            print(f"{result.source}\t{result.seconds * 1000:.1f} ms\t{outcome}")
+
+    elapsed = time.perf_counter() - start
+    rate = scanned / elapsed if elapsed else 0.0
+    print(f"Scanned {scanned} images ({decoded} decoded, {failed} errors) in {elapsed:.2f}s, {rate:.1f} images/s",
+          file=sys.stderr)
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
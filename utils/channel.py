@@ -0,0 +1,118 @@
+import itertools
+import queue
+import threading
+import weakref
+from collections import deque
+
+from utils.metrics import CHANNEL_COALESCED, CHANNEL_DEPTH, CHANNEL_DROPPED
+
+# Events that describe a state rather than something that happened: only the
+# latest one per slot matters, so a newer event replaces any undelivered one
+COALESCED_EVENTS = {
+    "ws_connected": "connection",
+    "disconnected": "connection",
+    "ws_confirmed": "confirmation",
+    "error": "error",
+    "profile_updated": "profile",
+}
+
+# Events that must reach the render loop even when the channel is full
+TERMINAL_EVENTS = {"login_success", "qr_expired"}
+
+# Every live channel, so the depth gauge can sum them at scrape time
+_channels = weakref.WeakSet()
+
+
+class EventChannel:
+    """Bounded, coalescing hand-off from WebSocket callbacks to a session's render loop.
+
+    Mirrors the parts of queue.Queue the app uses (put, get_nowait, empty,
+    qsize). Status events collapse per slot, other events are capped at
+    maxsize by dropping the oldest non-terminal one, and terminal events are
+    never dropped, so an idle tab holds a bounded amount of memory.
+    """
+
+    def __init__(self, maxsize=50, coalesced=None, terminal=None):
+        self.maxsize = maxsize
+        self.coalesced_events = COALESCED_EVENTS if coalesced is None else coalesced
+        self.terminal_events = TERMINAL_EVENTS if terminal is None else terminal
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._events = deque()
+        self._latest = {}
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped = 0
+        _channels.add(self)
+
+    def put(self, message):
+        message_type = message.get("type")
+        with self._lock:
+            entry = (next(self._seq), message)
+            slot = self.coalesced_events.get(message_type)
+            if slot is not None:
+                if slot in self._latest:
+                    self.coalesced += 1
+                    CHANNEL_COALESCED.inc()
+                self._latest[slot] = entry
+                return
+
+            if len(self._events) >= self.maxsize and message_type not in self.terminal_events:
+                self._drop_oldest()
+            self._events.append(entry)
+
+    # queue.Queue compatibility
+    put_nowait = put
+
+    def _drop_oldest(self):
+        for index, (_, message) in enumerate(self._events):
+            if message.get("type") not in self.terminal_events:
+                del self._events[index]
+                self.dropped += 1
+                CHANNEL_DROPPED.inc()
+                return
+
+    def get_nowait(self):
+        """Return the oldest pending event; raises queue.Empty when there is none"""
+        with self._lock:
+            slot = min(self._latest, key=lambda s: self._latest[s][0], default=None)
+            if slot is not None and (not self._events or self._latest[slot][0] < self._events[0][0]):
+                _, message = self._latest.pop(slot)
+            elif self._events:
+                _, message = self._events.popleft()
+            else:
+                raise queue.Empty
+            self.delivered += 1
+            return message
+
+    def drain(self):
+        """Return every pending event in arrival order and empty the channel"""
+        with self._lock:
+            entries = sorted(itertools.chain(self._events, self._latest.values()), key=lambda e: e[0])
+            self._events.clear()
+            self._latest.clear()
+            self.delivered += len(entries)
+        return [message for _, message in entries]
+
+    def qsize(self):
+        with self._lock:
+            return len(self._events) + len(self._latest)
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "depth": len(self._events) + len(self._latest),
+                "delivered": self.delivered,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+            }
+
+
+def _total_depth():
+    return sum(channel.qsize() for channel in list(_channels))
+
+
+CHANNEL_DEPTH.set_function(_total_depth)
@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import socket
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+ENV_PREFIX = "SECURELINK_"
+DEFAULT_CONFIG_FILES = ("securelink.toml", "securelink.json")
+
+DEFAULT_API_BASE_URL = "https://qr-auth-server.onrender.com"
+
+
+def ws_url_for(api_base_url):
+    """wss:// for https:// deployments, ws:// for plain http ones"""
+    scheme, rest = api_base_url.split("://", 1)
+    return f"{'wss' if scheme == 'https' else 'ws'}://{rest}"
+
+
+@dataclass
+class Endpoint:
+    name: str
+    api_base_url: str
+    ws_base_url: str = None
+
+    def __post_init__(self):
+        self.api_base_url = self.api_base_url.rstrip("/")
+        self.ws_base_url = (self.ws_base_url or ws_url_for(self.api_base_url)).rstrip("/")
+
+
+@dataclass
+class Settings:
+    endpoints: list = field(default_factory=lambda: [Endpoint("default", DEFAULT_API_BASE_URL)])
+    select_fastest_endpoint: bool = True
+    endpoint_probe_timeout: float = 2.0
+
+    # HTTP client
+    http_timeout: float = 10.0
+    http_pool_size: int = 20
+    http_retries: int = 3
+    http_backoff: float = 0.3
+
+    # WebSockets
+    ws_ping_interval: float = 60.0
+    ws_ping_timeout: float = 30.0
+    ws_max_reconnect_attempts: int = 5
+    ws_backoff_base: float = 1.0
+    ws_backoff_cap: float = 60.0
+    ws_stable_after: float = 10.0
+
+    # Refresh cadence and per-session buffers
+    login_status_refresh: float = 20.0
+    message_queue_size: int = 50
+    dashboard_event_poll: float = 2.0
+    dashboard_fetch_deadline: float = 5.0
+
+    # Bulk device revocation
+    bulk_revoke_concurrency: int = 8
+    bulk_revoke_batch_size: int = 100
+    bulk_revoke_deadline: float = 60.0
+
+    # Caches and the QR session pool
+    device_cache_ttl: float = 30.0
+    device_cache_size: int = 1024
+    device_page_size: int = 20
+    qr_image_cache_size: int = 512
+    qr_pool_size: int = 5
+    qr_pool_min_ttl: float = 60.0
+    qr_local_render: bool = True
+    qr_auto_rotate: bool = False
+
+    # Session reaper: tabs whose browser went away (idle_timeout only applies
+    # where the runtime can't tell whether a tab is still connected)
+    session_idle_timeout: float = 900.0
+    session_disconnect_grace: float = 60.0
+
+    # Instrumentation
+    metrics_port: int = None
+    metrics_host: str = "127.0.0.1"
+    admin_panel: bool = False
+
+    endpoint: Endpoint = None
+
+    @property
+    def api_base_url(self):
+        return (self.endpoint or self.endpoints[0]).api_base_url
+
+    @property
+    def ws_base_url(self):
+        return (self.endpoint or self.endpoints[0]).ws_base_url
+
+
+def _convert(name, value, default):
+    if isinstance(default, bool):
+        if isinstance(value, bool):
+            return value
+        return str(value).strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, int) or (default is None and name.endswith("_port")):
+        return int(value) if value not in ("", None) else None
+    if isinstance(default, float):
+        return float(value)
+    return value
+
+
+def _parse_endpoints(value):
+    # "eu=https://eu.example.com,us=https://us.example.com" or a bare URL
+    endpoints = []
+    for index, item in enumerate(part.strip() for part in value.split(",") if part.strip()):
+        name, _, url = item.partition("=") if "=" in item.split("://")[0] else ("", "", item)
+        endpoints.append(Endpoint(name or f"endpoint-{index + 1}", url))
+    return endpoints
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        if path.endswith(".toml"):
+            import tomllib
+            return tomllib.load(f)
+        return json.load(f)
+
+
+def load_settings(path=None, environ=None):
+    """Build Settings from defaults, then a config file, then SECURELINK_* variables"""
+    environ = os.environ if environ is None else environ
+    values = {}
+
+    path = path or environ.get(f"{ENV_PREFIX}CONFIG")
+    if path is None:
+        path = next((p for p in DEFAULT_CONFIG_FILES if os.path.exists(p)), None)
+    if path:
+        data = _read_file(path)
+        if "endpoints" in data:
+            values["endpoints"] = [Endpoint(**endpoint) for endpoint in data.pop("endpoints")]
+        values.update(data)
+
+    defaults = Settings()
+    for setting in fields(Settings):
+        if setting.name in ("endpoints", "endpoint"):
+            continue
+        raw = environ.get(f"{ENV_PREFIX}{setting.name.upper()}")
+        if raw is not None:
+            values[setting.name] = raw
+        if setting.name in values:
+            values[setting.name] = _convert(setting.name, values[setting.name], getattr(defaults, setting.name))
+
+    if environ.get(f"{ENV_PREFIX}ENDPOINTS"):
+        values["endpoints"] = _parse_endpoints(environ[f"{ENV_PREFIX}ENDPOINTS"])
+    elif environ.get(f"{ENV_PREFIX}API_BASE_URL"):
+        values["endpoints"] = [Endpoint("env", environ[f"{ENV_PREFIX}API_BASE_URL"],
+                                        environ.get(f"{ENV_PREFIX}WS_BASE_URL"))]
+
+    unknown = set(values) - {f.name for f in fields(Settings)}
+    if unknown:
+        raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+    return Settings(**values)
+
+
+def probe_latency(endpoint, timeout=2.0, attempts=3):
+    """Median TCP connect time to an endpoint in seconds, or None if unreachable"""
+    parts = urlsplit(endpoint.api_base_url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    samples = []
+    for _ in range(attempts):
+        start = time.perf_counter()
+        try:
+            socket.create_connection((parts.hostname, port), timeout=timeout).close()
+        except OSError:
+            continue
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) if samples else None
+
+
+def select_endpoint(endpoints, timeout=2.0):
+    """Pick the endpoint with the lowest connect latency; the first one if none answer"""
+    if len(endpoints) == 1:
+        return endpoints[0]
+    with ThreadPoolExecutor(max_workers=len(endpoints)) as pool:
+        latencies = list(pool.map(lambda e: probe_latency(e, timeout), endpoints))
+    reachable = [(latency, index) for index, latency in enumerate(latencies) if latency is not None]
+    for endpoint, latency in zip(endpoints, latencies):
+        shown = f"{latency * 1000:.1f} ms" if latency is not None else "unreachable"
+        logger.info(f"📡 Endpoint {endpoint.name} ({endpoint.api_base_url}): {shown}")
+    if not reachable:
+        return endpoints[0]
+    return endpoints[min(reachable)[1]]
+
+
+_settings = None
+_settings_lock = threading.Lock()
+
+
+def get_settings():
+    """Process-wide Settings, loaded (and the endpoint chosen) on first use"""
+    global _settings
+    if _settings is None:
+        with _settings_lock:
+            if _settings is None:
+                settings = load_settings()
+                if settings.select_fastest_endpoint:
+                    settings.endpoint = select_endpoint(settings.endpoints, settings.endpoint_probe_timeout)
+                else:
+                    settings.endpoint = settings.endpoints[0]
+                logger.info(f"🌐 Using endpoint {settings.endpoint.name}: {settings.api_base_url}")
+                _settings = settings
+    return _settings
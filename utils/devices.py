@@ -0,0 +1,74 @@
+from collections import namedtuple
+from datetime import datetime, timezone
+
+DATE_FORMAT = "%b %d, %Y at %H:%M"
+
+# Sort options offered by the device list: label -> (server sort parameter,
+# local sort key, descending)
+SORT_OPTIONS = {
+    "Last active": ("-last_active", lambda d: d.last_active, True),
+    "Newest": ("-created_at", lambda d: d.created_at, True),
+    "Oldest": ("created_at", lambda d: d.created_at, False),
+    "Name": ("device_name", lambda d: d.device_name.casefold(), False),
+}
+DEFAULT_SORT = "Last active"
+
+# A device with its dates parsed and formatted once, when the list is fetched,
+# rather than on every rerun; created_at/last_active are aware UTC datetimes, or
+# None when the server didn't send one
+Device = namedtuple("Device", [
+    "id", "device_id", "device_name", "created_at", "last_active", "created_label", "last_active_label",
+])
+
+# One window of a device listing; total counts every device matching the search
+DevicePage = namedtuple("DevicePage", ["items", "total", "offset", "limit"])
+
+
+def _parse_date(value):
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+    # Naive timestamps are taken as UTC, so they compare with aware ones
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def parse_device(raw):
+    created_at = _parse_date(raw.get("created_at"))
+    last_active = _parse_date(raw.get("last_active"))
+    return Device(
+        id=raw.get("id"),
+        device_id=raw.get("device_id"),
+        device_name=raw.get("device_name") or "Unnamed device",
+        created_at=created_at,
+        last_active=last_active,
+        created_label=created_at.strftime(DATE_FORMAT) if created_at is not None else "Unknown",
+        last_active_label=last_active.strftime(DATE_FORMAT) if last_active is not None else "Unknown",
+    )
+
+
+def parse_page(payload, offset, limit):
+    """DevicePage from a /devices response.
+
+    Paginating servers answer {"items": [...], "total": N}; older ones ignore
+    the query and return every device as a bare list, which comes back as a
+    single page with limit=None for query_devices() to window locally.
+    """
+    if isinstance(payload, list):
+        return DevicePage([parse_device(raw) for raw in payload], len(payload), 0, None)
+    items = [parse_device(raw) for raw in payload.get("items", [])]
+    return DevicePage(items, payload.get("total", offset + len(items)), payload.get("offset", offset), limit)
+
+
+def query_devices(devices, search="", sort=DEFAULT_SORT, offset=0, limit=None):
+    """Filter, sort and window an already fetched device list"""
+    needle = search.strip().casefold()
+    if needle:
+        devices = [d for d in devices if needle in d.device_name.casefold() or needle in str(d.device_id).casefold()]
+    _, key, descending = SORT_OPTIONS.get(sort, SORT_OPTIONS[DEFAULT_SORT])
+    # Devices without the sort date go last in either direction
+    known = [d for d in devices if key(d) is not None]
+    unknown = [d for d in devices if key(d) is None]
+    devices = sorted(known, key=key, reverse=descending) + unknown
+    end = None if limit is None else offset + limit
+    return DevicePage(devices[offset:end], len(devices), offset, limit)
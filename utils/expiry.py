@@ -0,0 +1,66 @@
+import logging
+import threading
+from datetime import datetime, timezone
+
+from utils.metrics import EXPIRY_PENDING, QR_EXPIRED
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryScheduler:
+    """Runs a callback for each key exactly when its expires_at passes.
+
+    Deadlines are timers on the shared event loop (loop.call_at, a heap
+    underneath), so thousands of pending QR codes cost no threads and no
+    polling. The handle table is only touched on the loop thread, so it
+    needs no lock; schedule() and cancel() are safe to call from any thread.
+    Callbacks run on the loop thread and must not block.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self._handles = {}
+
+    def schedule(self, key, expires_at, callback):
+        """Call callback() at expires_at (an aware datetime), replacing any earlier timer for key"""
+        self.loop.call_soon_threadsafe(self._arm, key, expires_at, callback)
+
+    def cancel(self, key):
+        self.loop.call_soon_threadsafe(self._disarm, key)
+
+    def _arm(self, key, expires_at, callback):
+        self._disarm(key)
+        # Converted on the loop thread, so the delay isn't stale by the time it's armed
+        delay = max(0.0, (expires_at - datetime.now(timezone.utc)).total_seconds())
+        self._handles[key] = self.loop.call_at(self.loop.time() + delay, self._fire, key, callback)
+
+    def _disarm(self, key):
+        handle = self._handles.pop(key, None)
+        if handle is not None:
+            handle.cancel()
+
+    def _fire(self, key, callback):
+        self._handles.pop(key, None)
+        QR_EXPIRED.inc()
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"❌ Expiry callback for {key} failed: {e}")
+
+    def __len__(self):
+        return len(self._handles)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_expiry_scheduler(loop):
+    """Return the process-wide ExpiryScheduler on loop"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = ExpiryScheduler(loop)
+                EXPIRY_PENDING.set_function(lambda: len(_scheduler))
+    return _scheduler
@@ -0,0 +1,20 @@
+import streamlit as st
+
+# Session-state key: toasts waiting for the next script or fragment run
+_PENDING_KEY = "_pending_toasts"
+
+
+def notify(message, icon=None):
+    """Queue a toast for the next run, so an action can st.rerun() right away.
+
+    A toast sent just before st.rerun() is dropped along with the rest of the
+    interrupted run; queued ones are shown by flush() once the rerun starts.
+    """
+    st.session_state.setdefault(_PENDING_KEY, []).append((message, icon))
+
+
+def flush():
+    """Show queued toasts; call at the start of every run that may follow a notify()"""
+    pending = st.session_state.pop(_PENDING_KEY, None)
+    for message, icon in pending or ():
+        st.toast(message, icon=icon)
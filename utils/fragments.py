@@ -0,0 +1,126 @@
+import functools
+
+import streamlit as st
+from streamlit.proto.ClientState_pb2 import ClientState
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import RerunData, get_script_run_ctx
+
+# Session-state key: Streamlit's id and the data dependencies of each tracked
+# fragment rendered on the current page, in page order
+_RENDERED_KEY = "_fragment_deps"
+
+# Per-run bookkeeping that main() does on full runs, by name (the app script
+# re-registers them on every run)
+_rerun_hooks = {}
+
+
+def on_fragment_rerun(hook):
+    """Also call hook() at the start of fragment-only reruns of tracked fragments"""
+    _rerun_hooks[hook.__qualname__] = hook
+    return hook
+
+
+def begin_app_run():
+    """Forget the previous page's fragments; call at the top of every full script run"""
+    st.session_state[_RENDERED_KEY] = {}
+
+
+def in_fragment_rerun():
+    """True while Streamlit is re-executing fragments only, not the whole script"""
+    ctx = get_script_run_ctx()
+    return bool(ctx and ctx.fragment_ids_this_run)
+
+
+def tracked_fragment(*deps, run_every=None):
+    """st.fragment that records which data dependencies its output is built from.
+
+    rerun_for() uses those records to re-execute only the fragments an update
+    affects, wherever the update happened. Read inputs from st.session_state
+    inside the fragment rather than passing them as arguments: a fragment
+    rerun reuses the arguments of the last full run.
+    """
+    def decorator(func):
+        name = func.__qualname__
+
+        @st.fragment(run_every=run_every)
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            ctx = get_script_run_ctx()
+            fragment_id = ctx.current_fragment_id if ctx else None
+            st.session_state.setdefault(_RENDERED_KEY, {})[name] = (fragment_id, frozenset(deps))
+            if in_fragment_rerun():
+                for hook in list(_rerun_hooks.values()):
+                    hook()
+            return func(*args, **kwargs)
+
+        wrapper.deps = frozenset(deps)
+        return wrapper
+    return decorator
+
+
+def affected_fragments(*deps):
+    """{name: fragment id} of the rendered fragments that depend on any of deps, in page order"""
+    changed = set(deps)
+    rendered = st.session_state.get(_RENDERED_KEY, {})
+    return {name: fragment_id for name, (fragment_id, fragment_deps) in rendered.items() if fragment_deps & changed}
+
+
+def rerun_for(*deps):
+    """Rerun whatever displays deps after they changed.
+
+    During a fragment rerun, re-executes just the fragments that depend on
+    deps, plus the calling fragment so an action interrupted half way through
+    drawing it is redrawn whole; the rest of the page is left as it is. During
+    a full run, fragments not drawn yet pick the change up anyway, so the app
+    only reruns if one that was already drawn depends on deps. Returns False,
+    without rerunning, when no rendered fragment does.
+    """
+    affected = affected_fragments(*deps)
+    if not affected:
+        return False
+    ctx = get_script_run_ctx()
+    if not in_fragment_rerun() or None in affected.values():
+        st.rerun()
+    queue = list(affected.values())
+    if ctx.current_fragment_id and ctx.current_fragment_id not in queue:
+        queue.append(ctx.current_fragment_id)
+    # What st.rerun(scope="fragment") requests, for a chosen set of fragments;
+    # they were all registered by the last full run, so Streamlit can replay them
+    ctx.script_requests.request_rerun(
+        RerunData(
+            query_string=ctx.query_string,
+            page_script_hash=ctx.page_script_hash,
+            fragment_id_queue=queue,
+            is_fragment_scoped_rerun=True,
+        )
+    )
+    # Yield to the script runner, which stops this run and starts the requested one
+    st.empty()
+
+
+def wake_session(session_id, fragment_id=None):
+    """Rerun browser session session_id from outside its script thread.
+
+    For socket callbacks and timers that queue something the page shows.
+    Reruns just fragment_id if the session still has it registered, else the
+    whole page, with the widget state of the session's last run (what
+    Streamlit itself does when a source file changes). Returns False when the
+    session isn't connected.
+    """
+    if session_id is None or not Runtime.exists():
+        return False
+    info = Runtime.instance()._session_mgr.get_active_session_info(session_id)
+    if info is None:
+        return False
+    session = info.session
+
+    def rerun():
+        client_state = ClientState()
+        client_state.CopyFrom(session._client_state)
+        registered = fragment_id is not None and session._fragment_storage.contains(fragment_id)
+        client_state.fragment_id = fragment_id if registered else ""
+        session.request_rerun(client_state)
+
+    # An AppSession may only be driven from the server's event loop
+    session._event_loop.call_soon_threadsafe(rerun)
+    return True
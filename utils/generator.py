@@ -1,24 +1,130 @@
-import streamlit as st
-
-# Data to encode in the QR code (unique session token)
-session_token = "1234567890"
-
-# Generate the QR code
-@st.cache_data(ttl=600)
-def generate_qr():
-    import qrcode as qr
-    qr = qr.QRCode(
-        version=1,
-        error_correction=qr.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
+import hashlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.cache import get_cache
+
+ERROR_CORRECTION_LEVELS = ("L", "M", "Q", "H")
+FORMATS = ("png", "svg")
+
+# Below this many uncached payloads a batch is rendered in-process
+MIN_PARALLEL_BATCH = 64
+
+# Rendered codes by content hash; the key covers every rendering parameter
+_qr_cache = get_cache("qr_codes", maxsize=4096, ttl=24 * 60 * 60)
+
+
+def cache_key(payload, version=None, error_correction="M", box_size=10, border=4, fmt="png"):
+    """Content address of a rendered QR code"""
+    spec = f"{version}|{error_correction}|{box_size}|{border}|{fmt}|".encode("utf-8")
+    data = payload if isinstance(payload, bytes) else str(payload).encode("utf-8")
+    return hashlib.sha256(spec + data).hexdigest()
+
+
+def _render(payload, version, error_correction, box_size, border, fmt):
+    import qrcode
+    code = qrcode.QRCode(
+        version=version,
+        error_correction=getattr(qrcode.constants, f"ERROR_CORRECT_{error_correction}"),
+        box_size=box_size,
+        border=border,
     )
+    code.add_data(payload)
+    code.make(fit=version is None)
+
+    if fmt == "svg":
+        from qrcode.image.svg import SvgPathImage
+        return code.make_image(image_factory=SvgPathImage).to_string(encoding="unicode").encode("utf-8")
+
+    img = code.make_image(fill_color="black", back_color="white")
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _render_args(args):
+    return _render(*args)
+
+
+def _check(version, error_correction, fmt):
+    if version is not None and not 1 <= version <= 40:
+        raise ValueError(f"QR version must be between 1 and 40, got {version}")
+    if error_correction not in ERROR_CORRECTION_LEVELS:
+        raise ValueError(f"error_correction must be one of {ERROR_CORRECTION_LEVELS}, got {error_correction!r}")
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {FORMATS}, got {fmt!r}")
+
+
+def _read_cached(key, cache_dir, fmt):
+    data = _qr_cache.get(key)
+    if data is None and cache_dir:
+        try:
+            with open(os.path.join(cache_dir, f"{key}.{fmt}"), "rb") as f:
+                data = f.read()
+            _qr_cache.set(key, data)
+        except FileNotFoundError:
+            pass
+    return data
+
+
+def _write_cached(key, data, cache_dir, fmt):
+    _qr_cache.set(key, data)
+    if cache_dir:
+        # Write then rename, so concurrent writers of the same code never clash
+        os.makedirs(cache_dir, exist_ok=True)
+        path = os.path.join(cache_dir, f"{key}.{fmt}")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+# Generate one QR code in memory
+def generate_qr(payload, version=None, error_correction="M", box_size=10, border=4, fmt="png", cache_dir=None,
+                cache=True):
+    """Return the QR code for payload as PNG or SVG bytes.
+
+    version=None picks the smallest version that fits. Results are cached in
+    memory (and under cache_dir when given) by a hash of payload and options;
+    cache=False renders without caching, for short-lived payloads the caller
+    keeps for exactly as long as they are valid.
+    """
+    _check(version, error_correction, fmt)
+    if not cache:
+        return _render(payload, version, error_correction, box_size, border, fmt)
+    key = cache_key(payload, version, error_correction, box_size, border, fmt)
+    data = _read_cached(key, cache_dir, fmt)
+    if data is None:
+        data = _render(payload, version, error_correction, box_size, border, fmt)
+        _write_cached(key, data, cache_dir, fmt)
+    return data
+
 
-    qr.add_data(session_token)
-    qr.make(fit=True)
+# Generate many QR codes, rendering cache misses across a process pool
+def generate_qr_batch(payloads, version=None, error_correction="M", box_size=10, border=4, fmt="png",
+                      cache_dir=None, workers=None, chunksize=32):
+    """Return a list of QR code bytes, in the same order as payloads"""
+    _check(version, error_correction, fmt)
+    payloads = list(payloads)
+    keys = [cache_key(p, version, error_correction, box_size, border, fmt) for p in payloads]
+    results = [_read_cached(key, cache_dir, fmt) for key in keys]
 
-    # Create an image from the QR code instance
-    img = qr.make_image(fill_color="black", back_color="white")
+    # Render each distinct missing code once
+    missing = {}
+    for index, data in enumerate(results):
+        if data is None:
+            missing.setdefault(keys[index], payloads[index])
+    if missing:
+        args = [(p, version, error_correction, box_size, border, fmt) for p in missing.values()]
+        if len(args) < MIN_PARALLEL_BATCH or workers == 1:
+            rendered = [_render_args(a) for a in args]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                rendered = list(pool.map(_render_args, args, chunksize=chunksize))
+        rendered = dict(zip(missing, rendered))
+        for key, data in rendered.items():
+            _write_cached(key, data, cache_dir, fmt)
+        results = [data if data is not None else rendered[key] for key, data in zip(keys, results)]
 
-    # Save the QR code as an image
-    img.save("./assets/qrcode.png")
\ No newline at end of file
+    return results
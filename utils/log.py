@@ -0,0 +1,114 @@
+import atexit
+import logging
+import queue
+import random
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_listener = None
+_configure_lock = threading.Lock()
+
+
+class _Fields:
+    """key=value rendering of event fields, only done if the record is emitted"""
+    __slots__ = ("fields",)
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def __str__(self):
+        return " ".join(f"{key}={value!r}" for key, value in self.fields.items())
+
+
+class _LazyQueueHandler(QueueHandler):
+    # QueueHandler.prepare() formats the message on the calling thread; defer
+    # that to the listener thread unless a traceback has to be captured now
+    def prepare(self, record):
+        if record.exc_info:
+            return super().prepare(record)
+        return record
+
+
+def configure_logging(level=logging.INFO, handler=None):
+    """Route all logging through a queue drained by a background listener thread.
+
+    Safe to call on every script run: only the first call installs handlers.
+    """
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+        handler = handler or logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(_LazyQueueHandler(log_queue))
+        root.setLevel(level)
+        _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+class StructuredLogger:
+    """Emits `event key=value ...` records with sampling and per-event rate limits.
+
+    Disabled levels cost one isEnabledFor() check; fields are formatted only
+    by the listener thread when a record is actually written.
+    """
+
+    def __init__(self, name):
+        self.logger = logging.getLogger(name)
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _allowed(self, event, rate):
+        # Token bucket per event: at most `rate` records per second, bursting to `rate`
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, suppressed = self._buckets.get(event, (rate, now, 0))
+            tokens = min(rate, tokens + (now - last) * rate)
+            if tokens < 1:
+                self._buckets[event] = (tokens, now, suppressed + 1)
+                return False, 0
+            self._buckets[event] = (tokens - 1, now, 0)
+            return True, suppressed
+
+    def log(self, level, event, sample=None, rate=None, **fields):
+        if not self.logger.isEnabledFor(level):
+            return
+        if sample is not None and random.random() >= sample:
+            return
+        if rate is not None:
+            allowed, suppressed = self._allowed(event, rate)
+            if not allowed:
+                return
+            if suppressed:
+                fields["suppressed"] = suppressed
+        self.logger.log(level, "%s %s", event, _Fields(fields))
+
+    def debug(self, event, **kwargs):
+        self.log(logging.DEBUG, event, **kwargs)
+
+    def info(self, event, **kwargs):
+        self.log(logging.INFO, event, **kwargs)
+
+    def warning(self, event, **kwargs):
+        self.log(logging.WARNING, event, **kwargs)
+
+    def error(self, event, **kwargs):
+        self.log(logging.ERROR, event, **kwargs)
+
+
+_loggers = {}
+
+
+def get_structured_logger(name):
+    logger = _loggers.get(name)
+    if logger is None:
+        logger = _loggers.setdefault(name, StructuredLogger(name))
+    return logger
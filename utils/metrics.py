@@ -0,0 +1,219 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self.samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function):
+        """Read the (unlabelled) value from function at scrape time"""
+        self._function = function
+
+    def samples(self):
+        if self._function is not None:
+            try:
+                return [(self.name, (), (), self._function())]
+            except Exception:
+                return []
+        return super().samples()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[0][index] += 1
+            counts[1] += value
+            counts[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (bucket_counts, total, count) in self._values.items():
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    samples.append((f"{self.name}_bucket", key, (("le", _format_value(bound)),), bucket_count))
+                samples.append((f"{self.name}_sum", key, (), total))
+                samples.append((f"{self.name}_count", key, (), count))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"{name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+# Login flow: seconds from requesting a QR code to each stage
+LOGIN_STAGE_SECONDS = REGISTRY.histogram(
+    "securelink_login_stage_seconds",
+    "Seconds from QR request to each login stage (qr_ready, ws_connected, login_success)",
+    ["stage"],
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "securelink_http_request_seconds", "Backend API request latency", ["endpoint"],
+)
+HTTP_ERRORS = REGISTRY.counter(
+    "securelink_http_errors_total", "Backend API requests that failed or returned 5xx", ["endpoint"],
+)
+WS_CONNECTIONS = REGISTRY.gauge("securelink_ws_connections", "Sockets held by the WebSocket manager")
+WS_RECONNECTS = REGISTRY.counter("securelink_ws_reconnects_total", "WebSocket reconnect attempts")
+WS_ERRORS = REGISTRY.counter("securelink_ws_errors_total", "WebSocket connection errors")
+WS_CIRCUIT_OPENINGS = REGISTRY.counter("securelink_ws_circuit_openings_total", "Times a host circuit breaker opened")
+CHANNEL_DEPTH = REGISTRY.gauge("securelink_event_channel_depth", "Undelivered events across all session channels")
+CHANNEL_DROPPED = REGISTRY.counter("securelink_event_channel_dropped_total", "Events dropped by full channels")
+CHANNEL_COALESCED = REGISTRY.counter("securelink_event_channel_coalesced_total", "Status events replaced by a newer one")
+QR_POOL_SIZE = REGISTRY.gauge("securelink_qr_pool_size", "Unclaimed QR sessions in the pool")
+QR_POOL_REQUESTS = REGISTRY.counter("securelink_qr_pool_requests_total", "QR pool lookups", ["result"])
+SESSIONS_TRACKED = REGISTRY.gauge("securelink_sessions", "Browser sessions known to the session tracker")
+SESSIONS_REAPED = REGISTRY.counter("securelink_sessions_reaped_total", "Abandoned sessions whose sockets were closed")
+QR_EXPIRED = REGISTRY.counter("securelink_qr_expired_total", "Login QR codes whose socket was closed at expiry")
+EXPIRY_PENDING = REGISTRY.gauge("securelink_qr_expiry_pending", "Login QR codes waiting for their expiry timer")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve /metrics for Prometheus from a daemon thread; only the first call binds.
+
+    The endpoint has no authentication, so it listens on loopback unless a
+    wider host (e.g. "0.0.0.0") is passed explicitly.
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _server
@@ -0,0 +1,98 @@
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+from utils.metrics import QR_POOL_REQUESTS, QR_POOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+def seconds_until(expires_at):
+    """Seconds left before an ISO-8601 expires_at timestamp (negative once past)"""
+    expires = datetime.fromisoformat(expires_at.replace('Z', '+00:00'))
+    return (expires - datetime.now(timezone.utc)).total_seconds()
+
+
+class QRSessionPool:
+    """Keeps a few unclaimed QR sessions ready so a visitor never waits on /qr/generate.
+
+    A daemon thread tops the pool up to `size` whenever it is drained and
+    evicts entries with fewer than `min_ttl` seconds left, so whatever
+    acquire() hands out is still comfortably scannable.
+    """
+
+    def __init__(self, fetch, size=5, min_ttl=60, refill_interval=10, retry_delay=5):
+        self.fetch = fetch
+        self.size = size
+        self.min_ttl = min_ttl
+        self.refill_interval = refill_interval
+        self.retry_delay = retry_delay
+        self.hits = 0
+        self.misses = 0
+        self._sessions = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._refill_loop, name="qr-pool", daemon=True)
+        self._thread.start()
+
+    def acquire(self):
+        """Pop a fresh QR session, or None if the pool is empty"""
+        with self._lock:
+            self._evict_stale()
+            qr_data = self._sessions.popleft() if self._sessions else None
+            if qr_data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        QR_POOL_REQUESTS.inc(result="hit" if qr_data else "miss")
+        self._wakeup.set()
+        return qr_data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def _evict_stale(self):
+        while self._sessions and seconds_until(self._sessions[0]['expires_at']) < self.min_ttl:
+            evicted = self._sessions.popleft()
+            logger.info(f"♻️ Evicting pooled QR session {evicted['session_id']}")
+
+    def _refill_loop(self):
+        while True:
+            self._wakeup.clear()
+            delay = self.refill_interval
+            try:
+                with self._lock:
+                    self._evict_stale()
+                    missing = self.size - len(self._sessions)
+                for _ in range(missing):
+                    qr_data = self.fetch()
+                    if not qr_data:
+                        delay = self.retry_delay
+                        break
+                    with self._lock:
+                        self._sessions.append(qr_data)
+                # Wake up in time to replace the entry that expires first
+                with self._lock:
+                    if self._sessions:
+                        delay = min(delay, max(0, seconds_until(self._sessions[0]['expires_at']) - self.min_ttl))
+            except Exception as e:
+                logger.error(f"❌ QR pool refill error: {e}")
+                delay = self.retry_delay
+            self._wakeup.wait(delay)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_qr_pool(fetch, **kwargs):
+    """Return the process-wide QRSessionPool; arguments only apply when it is first created"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = QRSessionPool(fetch, **kwargs)
+                QR_POOL_SIZE.set_function(_pool.__len__)
+    return _pool
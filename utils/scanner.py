@@ -1,21 +1,125 @@
+import os
+
 import cv2
-import streamlit as st
+import numpy as np
 import pyzbar.pyzbar as decode
+from PIL import Image
+
+# Images are downscaled so their longest side is at most this many pixels
+MAX_SIDE = 1024
+
+# Adaptive threshold: local mean window as a fraction of the shortest side
+# (wide enough to span a finder pattern) and offset below the mean
+THRESHOLD_BLOCK_FRACTION = 1 / 6
+THRESHOLD_OFFSET = 10
+
+# Grayscale conversions for 3- and 4-channel images, by channel order. OpenCV
+# decodes to BGR; arrays from PIL, imageio and most other libraries are RGB.
+CHANNEL_ORDERS = {
+    "BGR": {3: cv2.COLOR_BGR2GRAY, 4: cv2.COLOR_BGRA2GRAY},
+    "RGB": {3: cv2.COLOR_RGB2GRAY, 4: cv2.COLOR_RGBA2GRAY},
+}
+
+
+def load_image(source):
+    """Turn bytes, memoryviews, NumPy arrays, PIL images or paths into a NumPy image.
+
+    Decoded files and buffers come back in OpenCV's BGR order and PIL images as
+    grayscale; NumPy arrays are returned as they are.
+    """
+    if isinstance(source, np.ndarray):
+        return source
+    if isinstance(source, Image.Image):
+        # PIL converts to luma itself, so no channel order has to be guessed
+        return np.asarray(source.convert("L"))
+    if isinstance(source, (str, os.PathLike)):
+        img = cv2.imread(os.fspath(source), cv2.IMREAD_UNCHANGED)
+        if img is None:
+            raise ValueError(f"Could not read image {source!r}")
+        return img
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        # Encoded PNG/JPEG bytes are decoded without touching the filesystem
+        buffer = np.frombuffer(source, dtype=np.uint8)
+        img = cv2.imdecode(buffer, cv2.IMREAD_UNCHANGED)
+        if img is None:
+            raise ValueError("Could not decode image buffer")
+        return img
+    raise TypeError(f"Unsupported image source: {type(source).__name__}")
+
+
+def to_grayscale(img, channel_order="BGR"):
+    """8-bit single-channel version of img; channel_order is "BGR" or "RGB" for colour images"""
+    if channel_order not in CHANNEL_ORDERS:
+        raise ValueError(f"channel_order must be one of {tuple(CHANNEL_ORDERS)}, got {channel_order!r}")
+    if img.dtype == np.uint16:
+        # 16-bit PNG/TIFF: keep the high byte instead of wrapping values modulo 256
+        img = (img >> 8).astype(np.uint8)
+    if img.ndim == 3 and img.shape[2] == 1:
+        img = img[:, :, 0]
+    if img.ndim == 2:
+        return img
+    # ITU-R BT.601 luma weights, applied to the right channels
+    return cv2.cvtColor(img, CHANNEL_ORDERS[channel_order][img.shape[2]])
+
+
+def downscale_factor(shape, max_side=MAX_SIDE):
+    """Integer factor downscale() shrinks an image of this shape by"""
+    return max(1, -(-max(shape[:2]) // max_side))
+
+
+def downscale(gray, max_side=MAX_SIDE):
+    """Integer-factor box downscale so the longest side fits max_side"""
+    factor = downscale_factor(gray.shape, max_side)
+    if factor == 1:
+        return gray
+    h, w = gray.shape[0] // factor * factor, gray.shape[1] // factor * factor
+    blocks = gray[:h, :w].reshape(h // factor, factor, w // factor, factor)
+    return blocks.mean(axis=(1, 3)).astype(np.uint8)
+
+
+def adaptive_threshold(gray, block=None, offset=THRESHOLD_OFFSET):
+    """Binarise against the local mean, computed with an integral image"""
+    if block is None:
+        block = max(15, int(min(gray.shape) * THRESHOLD_BLOCK_FRACTION))
+    block |= 1
+    pad = block // 2
+    padded = np.pad(gray.astype(np.int64), pad, mode="edge")
+    integral = np.pad(padded.cumsum(axis=0).cumsum(axis=1), ((1, 0), (1, 0)))
+    h, w = gray.shape
+    window = (
+        integral[block:block + h, block:block + w]
+        - integral[:h, block:block + w]
+        - integral[block:block + h, :w]
+        + integral[:h, :w]
+    )
+    mean = window / (block * block)
+    return np.where(gray > mean - offset, 255, 0).astype(np.uint8)
+
+
+def preprocess(img, max_side=MAX_SIDE, channel_order="BGR"):
+    """Grayscale and downscale an image; returns the plain and thresholded variants"""
+    gray = downscale(to_grayscale(img, channel_order), max_side)
+    return gray, adaptive_threshold(gray)
+
 
-# Scan the QR code
-@st.cache_data
-def scan_qr():
-    # Load the image containing the QR code
-    img = cv2.imread("./assets/qrcode.png")
+def decode_image(img, channel_order="BGR"):
+    """Return the pyzbar results for an already loaded image, trying plain then thresholded"""
+    gray, binary = preprocess(img, channel_order=channel_order)
+    for candidate in (gray, binary):
+        results = decode.decode(candidate)
+        if results:
+            return results
+    return []
 
-    # Decode the QR code
-    img_data = decode.decode(img)
 
-    if img_data:
-        # Extract the data from the QR code
-        data = img_data[0].data.decode("utf-8")
-        st.write(data)
+# Scan a QR code from memory (or a path) and return its payload
+def scan_qr(source, channel_order="BGR"):
+    """Decode the first QR code in source and return its text, or None if there is none.
 
-        # Authentication Logic
-    else:
-        st.write("QR code not found")
+    channel_order only applies to colour NumPy array sources: "BGR" for frames
+    from OpenCV, "RGB" for arrays from PIL, imageio and the like.
+    """
+    results = decode_image(load_image(source), channel_order)
+    if results:
+        return results[0].data.decode("utf-8")
+    return None
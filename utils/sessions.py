@@ -0,0 +1,219 @@
+import logging
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from utils.metrics import SESSIONS_REAPED, SESSIONS_TRACKED
+
+logger = logging.getLogger(__name__)
+
+
+class SessionRecord:
+    """What a browser session needs to remember about its login, and nothing more.
+
+    Replaces keeping the server's whole /qr/generate response (base64 PNG
+    included) in st.session_state; the image lives in the QR image cache.
+    Only when the image can't be re-rendered locally does the record keep
+    the server's copy (keep_image), so a cache eviction can't lose it.
+    """
+    __slots__ = ("session_id", "expires_at", "qr_payload", "token", "device_id", "qr_code_data")
+
+    def __init__(self, session_id, expires_at, qr_payload=None, token=None, device_id=None, qr_code_data=None):
+        self.session_id = session_id
+        self.expires_at = expires_at
+        self.qr_payload = qr_payload
+        self.token = token
+        self.device_id = device_id
+        self.qr_code_data = qr_code_data
+
+    @classmethod
+    def from_qr_session(cls, qr_data, keep_image=False):
+        expires_at = datetime.fromisoformat(qr_data['expires_at'].replace('Z', '+00:00'))
+        qr_code_data = qr_data.get('qr_code_data') if keep_image else None
+        return cls(qr_data['session_id'], expires_at, qr_data.get('qr_payload'), qr_code_data=qr_code_data)
+
+    def seconds_left(self):
+        return (self.expires_at - datetime.now(timezone.utc)).total_seconds()
+
+    def __repr__(self):
+        return f"SessionRecord(session_id={self.session_id!r}, logged_in={self.token is not None})"
+
+
+def approximate_size(value, depth=3, _seen=None):
+    """Rough deep size in bytes of plain containers and __slots__/__dict__ objects"""
+    _seen = set() if _seen is None else _seen
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    size = sys.getsizeof(value, 0)
+    if depth <= 0 or isinstance(value, (str, bytes, bytearray, int, float, bool)):
+        return size
+    if isinstance(value, dict):
+        items = [item for pair in value.items() for item in pair]
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        items = value
+    else:
+        items = [getattr(value, slot, None) for slot in getattr(type(value), "__slots__", ())]
+        items += list(getattr(value, "__dict__", {}).values())
+    return size + sum(approximate_size(item, depth - 1, _seen) for item in items)
+
+
+class _TrackedSession:
+    __slots__ = ("session_id", "page", "last_seen", "ws_client", "channel", "state_bytes", "measured_at", "reaped")
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.page = None
+        self.last_seen = time.monotonic()
+        self.ws_client = None
+        self.channel = None
+        self.state_bytes = 0
+        self.measured_at = 0.0
+        self.reaped = False
+
+
+class SessionTracker:
+    """Knows which browser sessions hold sockets and memory, and reclaims abandoned ones.
+
+    Every script run reports in through heartbeat(). A daemon thread closes
+    the sockets and drops the event backlog of sessions whose browser tab is
+    gone (is_active returns False) and that haven't run for disconnect_grace
+    seconds. A tab that is still connected is never reaped, however long it
+    sits idle: its socket is what keeps its page live. Without an is_active
+    check, sessions that haven't run for idle_timeout seconds are reaped
+    instead. A reaped session that comes back is told so by its next
+    heartbeat() and resets its own state; reaped ids are remembered for
+    tombstone_ttl seconds for that, which must outlast the 120s Streamlit
+    keeps a disconnected session around for its tab to reconnect to.
+    """
+
+    def __init__(self, idle_timeout=900, disconnect_grace=60, sweep_interval=30, measure_interval=30,
+                 is_active=None, tombstone_ttl=300):
+        self.idle_timeout = idle_timeout
+        self.disconnect_grace = disconnect_grace
+        self.sweep_interval = sweep_interval
+        self.measure_interval = measure_interval
+        self.is_active = is_active
+        self.tombstone_ttl = tombstone_ttl
+        self._sessions = {}
+        # session_id -> when it was reaped, for sessions dropped from _sessions
+        self._tombstones = {}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="session-reaper", daemon=True)
+        self._thread.start()
+
+    def heartbeat(self, session_id, page, state):
+        """Record a run of session_id; returns True if the session was reaped since its last run"""
+        now = time.monotonic()
+        with self._lock:
+            tracked = self._sessions.get(session_id)
+            if tracked is None:
+                tracked = self._sessions[session_id] = _TrackedSession(session_id)
+                tracked.reaped = self._tombstones.pop(session_id, None) is not None
+            was_reaped, tracked.reaped = tracked.reaped, False
+            tracked.page = page
+            tracked.last_seen = now
+            tracked.ws_client = state.get('ws_client')
+            tracked.channel = state.get('message_queue')
+            measure = now - tracked.measured_at >= self.measure_interval
+        if measure:
+            # The WebSocket client is mostly references into the shared manager; its
+            # event backlog is counted through message_queue
+            size = sum(approximate_size(state[key]) for key in list(state.keys()) if key != 'ws_client')
+            with self._lock:
+                tracked.state_bytes = size
+                tracked.measured_at = now
+        return was_reaped
+
+    def attach(self, session_id, ws_client=None, channel=None):
+        """Point the reaper at resources a run created after its heartbeat"""
+        with self._lock:
+            tracked = self._sessions.get(session_id)
+            if tracked is not None:
+                tracked.ws_client = ws_client
+                tracked.channel = channel
+
+    def forget(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._tombstones.pop(session_id, None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"❌ Session sweep failed: {e}")
+
+    def sweep(self):
+        """Reap abandoned sessions now; returns how many were reaped"""
+        now = time.monotonic()
+        reaped = []
+        with self._lock:
+            for session_id, reaped_at in list(self._tombstones.items()):
+                if now - reaped_at >= self.tombstone_ttl:
+                    del self._tombstones[session_id]
+            for session_id, tracked in list(self._sessions.items()):
+                idle = now - tracked.last_seen
+                if self.is_active is not None:
+                    if self.is_active(session_id) or idle < self.disconnect_grace:
+                        continue
+                    # The tab is gone; if it comes back within Streamlit's own session
+                    # TTL its next heartbeat() must still learn it was reaped
+                    del self._sessions[session_id]
+                    self._tombstones.setdefault(session_id, now)
+                    if tracked.reaped:
+                        continue
+                elif tracked.reaped or idle < self.idle_timeout:
+                    continue
+                tracked.reaped = True
+                reaped.append((tracked.ws_client, tracked.channel))
+                tracked.ws_client = tracked.channel = None
+        for ws_client, channel in reaped:
+            if ws_client is not None:
+                ws_client.disconnect()
+            if channel is not None:
+                channel.drain()
+        if reaped:
+            SESSIONS_REAPED.inc(len(reaped))
+            logger.info(f"🧹 Reaped {len(reaped)} abandoned session(s)")
+        return len(reaped)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def report(self):
+        """Per-session footprint, largest first"""
+        now = time.monotonic()
+        with self._lock:
+            rows = [
+                {
+                    "session": tracked.session_id[:8],
+                    "page": tracked.page,
+                    "idle_s": round(now - tracked.last_seen),
+                    "socket": "open" if tracked.ws_client is not None and tracked.ws_client.is_alive() else "closed",
+                    "queued_events": tracked.channel.qsize() if tracked.channel is not None else 0,
+                    "state_kb": round(tracked.state_bytes / 1024, 1),
+                    "reaped": tracked.reaped,
+                }
+                for tracked in self._sessions.values()
+            ]
+        return sorted(rows, key=lambda row: row["state_kb"], reverse=True)
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_session_tracker(**kwargs):
+    """Return the process-wide SessionTracker; kwargs only apply when it is first created"""
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = SessionTracker(**kwargs)
+                SESSIONS_TRACKED.set_function(lambda: len(_tracker))
+    return _tracker
@@ -0,0 +1,169 @@
+import math
+import time
+from collections import namedtuple
+
+import cv2
+import pyzbar.pyzbar as decode
+
+from utils.scanner import adaptive_threshold, downscale, downscale_factor, to_grayscale
+
+Detection = namedtuple("Detection", ["payload", "frame_index", "rect", "seconds"])
+
+
+def iter_video_frames(source=0):
+    """Yield BGR frames from a video file path or a camera index"""
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video source {source!r}")
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            yield frame
+    finally:
+        capture.release()
+
+
+class StreamStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.frames = 0
+        self.decoded_frames = 0
+        self.skipped_frames = 0
+        self.roi_frames = 0
+        self.detections = 0
+        self.decode_seconds = 0.0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def fps(self):
+        """Frames consumed per second, skipped ones included"""
+        return self.frames / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def decode_fps(self):
+        return self.decoded_frames / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return {
+            "frames": self.frames,
+            "decoded_frames": self.decoded_frames,
+            "skipped_frames": self.skipped_frames,
+            "roi_frames": self.roi_frames,
+            "detections": self.detections,
+            "fps": round(self.fps, 1),
+            "decode_fps": round(self.decode_fps, 1),
+            "avg_decode_ms": round(self.decode_seconds / self.decoded_frames * 1000, 2) if self.decoded_frames else 0.0,
+        }
+
+
+class StreamScanner:
+    """Scans a stream of frames for QR codes without decoding every frame at full size.
+
+    Frames are skipped so the average decode cost stays within
+    decode_budget seconds per incoming frame. After a hit, the code's region
+    (grown by roi_margin) is the only area decoded until it has been missed
+    roi_patience times in a row. Each distinct payload is emitted once.
+    channel_order is "BGR" for OpenCV frames, "RGB" for frames from other decoders.
+    """
+
+    def __init__(self, decode_budget=0.01, max_skip=10, roi_margin=0.5, roi_patience=5, smoothing=0.2,
+                 channel_order="BGR"):
+        self.decode_budget = decode_budget
+        self.max_skip = max_skip
+        self.roi_margin = roi_margin
+        self.roi_patience = roi_patience
+        self.smoothing = smoothing
+        self.channel_order = channel_order
+        self.stats = StreamStats()
+        self.seen = set()
+        self.roi = None
+        self.roi_misses = 0
+        self.decode_cost = 0.0
+
+    def _skip_interval(self):
+        # Decode one frame in every N so decode_cost / N stays within budget
+        if not self.decode_cost:
+            return 1
+        return max(1, min(self.max_skip + 1, math.ceil(self.decode_cost / self.decode_budget)))
+
+    def _decode(self, gray):
+        """Decode a grayscale frame or crop; returns (results, factor)"""
+        factor = downscale_factor(gray.shape)
+        small = downscale(gray)
+        results = decode.decode(small)
+        if not results:
+            results = decode.decode(adaptive_threshold(small))
+        return results, factor
+
+    def _grow(self, rect, shape):
+        left, top, width, height = rect
+        pad_x, pad_y = int(width * self.roi_margin), int(height * self.roi_margin)
+        return (
+            max(0, left - pad_x),
+            max(0, top - pad_y),
+            min(shape[1], left + width + pad_x),
+            min(shape[0], top + height + pad_y),
+        )
+
+    def process(self, frame):
+        """Decode one frame, returning (payload, rect) pairs in full-frame coordinates"""
+        x0 = y0 = 0
+        window = frame
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            window = frame[y0:y1, x0:x1]
+            self.stats.roi_frames += 1
+
+        results, factor = self._decode(to_grayscale(window, self.channel_order))
+        found = []
+        for result in results:
+            left, top, width, height = result.rect
+            rect = (x0 + left * factor, y0 + top * factor, width * factor, height * factor)
+            found.append((result.data.decode("utf-8"), rect))
+
+        if found:
+            self.roi = self._grow(found[0][1], frame.shape)
+            self.roi_misses = 0
+        elif self.roi is not None:
+            self.roi_misses += 1
+            if self.roi_misses >= self.roi_patience:
+                self.roi = None
+        return found
+
+    def scan(self, frames):
+        """Yield a Detection the first time each payload appears in frames.
+
+        frames is any iterable of images, or a video path / camera index.
+        """
+        if isinstance(frames, (str, int)):
+            frames = iter_video_frames(frames)
+        countdown = 0
+        for frame_index, frame in enumerate(frames):
+            self.stats.frames += 1
+            if countdown > 0:
+                countdown -= 1
+                self.stats.skipped_frames += 1
+                continue
+
+            start = time.perf_counter()
+            found = self.process(frame)
+            cost = time.perf_counter() - start
+            self.stats.decoded_frames += 1
+            self.stats.decode_seconds += cost
+            self.decode_cost = cost if not self.decode_cost else (
+                self.smoothing * cost + (1 - self.smoothing) * self.decode_cost
+            )
+            countdown = self._skip_interval() - 1
+
+            for payload, rect in found:
+                if payload in self.seen:
+                    continue
+                self.seen.add(payload)
+                self.stats.detections += 1
+                yield Detection(payload, frame_index, rect, self.stats.elapsed)
+
@@ -0,0 +1,89 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+STYLESHEET = "securelink.css"
+STYLE_ELEMENT_ID = "securelink-theme"
+
+# Runs in a same-origin component iframe. The stylesheet is fetched once per
+# browser (the ?v= query makes Streamlit's static handler send a far-future
+# Cache-Control) and adopted into the parent page's <head>, where it outlives
+# reruns. Later reruns find the current version already there and do nothing.
+# A <link> tag can't be used directly: Streamlit serves non-image static files
+# as text/plain with nosniff, which browsers refuse to apply as a stylesheet.
+_LOADER = """<script>
+(function () {{
+  const doc = window.parent.document;
+  const current = doc.getElementById({element_id});
+  if (current && current.dataset.version === {version}) return;
+  fetch(new URL({url}, doc.baseURI), {{cache: "force-cache"}})
+    .then((response) => response.ok ? response.text() : Promise.reject(response.status))
+    .then((css) => {{
+      const style = doc.createElement("style");
+      style.id = {element_id};
+      style.dataset.version = {version};
+      style.textContent = css;
+      const stale = doc.getElementById({element_id});
+      if (stale) stale.replaceWith(style); else doc.head.appendChild(style);
+    }})
+    .catch((error) => console.warn("SecureLink theme failed to load", error));
+}})();
+</script>"""
+
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+def asset_version(name, static_dir=STATIC_DIR):
+    """Short content hash of a static asset, recomputed only when the file changes"""
+    path = os.path.join(static_dir, name)
+    mtime = os.stat(path).st_mtime_ns
+    with _versions_lock:
+        cached = _versions.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    with open(path, "rb") as f:
+        version = hashlib.sha256(f.read()).hexdigest()[:12]
+    with _versions_lock:
+        _versions[path] = (mtime, version)
+    return version
+
+
+def asset_url(name, static_dir=STATIC_DIR):
+    """Content-versioned URL for a file under static/, relative to the app root"""
+    return f"app/static/{name}?v={asset_version(name, static_dir)}"
+
+
+@functools.lru_cache(maxsize=8)
+def _read_stylesheet(name, version):
+    with open(os.path.join(STATIC_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def load_theme(name=STYLESHEET):
+    """Apply the app stylesheet; call once per script run, before other elements.
+
+    With static serving enabled each rerun only sends a small loader element
+    instead of the whole stylesheet. Without it, the CSS is inlined as before.
+    """
+    if not st.get_option("server.enableStaticServing"):
+        logger.debug("Static serving is disabled; inlining %s", name)
+        st.markdown(f"<style>\n{_read_stylesheet(name, asset_version(name))}</style>", unsafe_allow_html=True)
+        return
+    components.html(
+        _LOADER.format(
+            element_id=json.dumps(STYLE_ELEMENT_ID),
+            version=json.dumps(asset_version(name)),
+            url=json.dumps(asset_url(name)),
+        ),
+        height=0,
+    )
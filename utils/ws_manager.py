@@ -0,0 +1,269 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+
+from utils.metrics import WS_CIRCUIT_OPENINGS, WS_CONNECTIONS, WS_ERRORS, WS_RECONNECTS
+
+logger = logging.getLogger(__name__)
+
+
+def is_final_close(code):
+    """Close codes that mean "don't come back": policy violation (an expired token,
+    an unknown login session) and the 4000-4999 range reserved for applications"""
+    return code == 1008 or (code is not None and 4000 <= code <= 4999)
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """Full-jitter exponential backoff, so sockets dropped together don't retry together"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+# Shared by every socket to one host; lives on the event loop thread, so needs no lock
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.probing or time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def wait_time(self):
+        """Seconds a caller must wait before connecting; 0 lets it through"""
+        if self.opened_at is None:
+            return 0.0
+        remaining = self.opened_at + self.reset_timeout - time.monotonic()
+        if remaining > 0:
+            return remaining
+        if self.probing:
+            # Someone else is testing the host; check back shortly
+            return random.uniform(1.0, 3.0)
+        self.probing = True
+        return 0.0
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info("✅ Circuit closed, server reachable again")
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def abandon(self):
+        """A connection attempt was cancelled before it could report back"""
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"⚠️ Circuit opened after {self.failures} failed connections")
+                WS_CIRCUIT_OPENINGS.inc()
+            self.opened_at = time.monotonic()
+
+
+# One subscription per login / user socket, owned by the shared event loop
+class Subscription:
+    def __init__(self, manager, url, on_message, on_open=None, on_close=None, on_error=None,
+                 user_agent=None, ping_interval=60, ping_timeout=30, max_reconnect_attempts=5,
+                 backoff_base=1.0, backoff_cap=60.0, stable_after=10.0):
+        self.manager = manager
+        self.url = url
+        self.on_message = on_message
+        self.on_open = on_open
+        self.on_close = on_close
+        self.on_error = on_error
+        self.user_agent = user_agent
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.max_reconnect_attempts = max_reconnect_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        # Seconds a connection must stay up before it counts as a recovery
+        self.stable_after = stable_after
+        self.breaker = manager.breaker_for(url)
+        self.reconnect_attempts = 0
+        self.closed = False
+        self.task = None
+        self.ws = None
+
+    @property
+    def alive(self):
+        return not self.closed and (self.task is None or not self.task.done())
+
+    def close(self):
+        """Stop the connection task; safe to call from any thread"""
+        if self.closed:
+            return
+        self.closed = True
+        self.manager.loop.call_soon_threadsafe(self._cancel)
+
+    def _cancel(self):
+        if self.task and not self.task.done():
+            self.task.cancel()
+
+    def send(self, message):
+        """Queue a frame on the connection from any thread"""
+        if self.ws is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.ws.send(message), self.manager.loop)
+
+    def _dispatch(self, callback, *args):
+        # Callbacks run on the loop thread, so they must never block
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            logger.error(f"❌ WebSocket callback error: {e}")
+
+    def _mark_stable(self):
+        self.reconnect_attempts = 0
+        self.breaker.record_success()
+
+    async def run(self):
+        try:
+            await self._run()
+        finally:
+            self.manager._forget(self)
+
+    async def _run(self):
+        # This task is the only owner of the connection: it alone reconnects,
+        # reusing the same coroutine rather than spawning new sockets or threads
+        while not self.closed:
+            wait = self.breaker.wait_time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            close_code, close_msg = None, None
+            stable = None
+            received = False
+            try:
+                async with connect(
+                    self.url,
+                    user_agent_header=self.user_agent,
+                    ping_interval=self.ping_interval,
+                    ping_timeout=self.ping_timeout,
+                ) as ws:
+                    self.ws = ws
+                    # The backoff only resets once the connection has stayed up, and the
+                    # breaker once it has stayed up or carried a frame: a server that
+                    # accepts and closes at once must not cause a reconnect storm
+                    opened_at = time.monotonic()
+                    stable = self.manager.loop.call_later(self.stable_after, self._mark_stable)
+                    self._dispatch(self.on_open, self)
+                    try:
+                        async for message in ws:
+                            if not received:
+                                received = True
+                                self.breaker.record_success()
+                            if isinstance(message, bytes):
+                                message = message.decode("utf-8", errors="replace")
+                            self._dispatch(self.on_message, self, message)
+                    except ConnectionClosed:
+                        pass
+                    # The connection object doesn't expose these in websockets 13; its protocol does
+                    close_code, close_msg = ws.protocol.close_code, ws.protocol.close_reason
+                    if not received and time.monotonic() - opened_at < self.stable_after:
+                        # Accepted, then dropped without a word: as bad as a refused connection
+                        self.breaker.record_failure()
+            except asyncio.CancelledError:
+                self.breaker.abandon()
+                raise
+            except Exception as e:
+                logger.error(f"❌ WebSocket connection error: {e}")
+                WS_ERRORS.inc()
+                self.breaker.record_failure()
+                self._dispatch(self.on_error, self, e)
+            finally:
+                if stable is not None:
+                    stable.cancel()
+                if self.ws is not None:
+                    self.ws = None
+                    self._dispatch(self.on_close, self, close_code, close_msg)
+
+            if is_final_close(close_code):
+                logger.info(f"🛑 Server closed the socket with {close_code} ({close_msg}), not reconnecting")
+                break
+            if self.closed or self.reconnect_attempts >= self.max_reconnect_attempts:
+                break
+            delay = backoff_delay(self.reconnect_attempts, self.backoff_base, self.backoff_cap)
+            self.reconnect_attempts += 1
+            WS_RECONNECTS.inc()
+            logger.info(f"🔄 Reconnecting in {delay:.1f}s ({self.reconnect_attempts}/{self.max_reconnect_attempts})")
+            await asyncio.sleep(delay)
+
+
+class WebSocketManager:
+    """Holds every login and user socket of the process as tasks on one event loop"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.subscriptions = set()
+        self.breakers = {}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run_loop, name="ws-manager", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def breaker_for(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            breaker = self.breakers.get(host)
+            if breaker is None:
+                breaker = self.breakers[host] = CircuitBreaker()
+            return breaker
+
+    def subscribe(self, url, on_message, **kwargs):
+        """Open a socket to url and route every frame to on_message(subscription, message)"""
+        subscription = Subscription(self, url, on_message, **kwargs)
+        with self._lock:
+            self.subscriptions.add(subscription)
+        self.loop.call_soon_threadsafe(self._start, subscription)
+        return subscription
+
+    def _start(self, subscription):
+        if subscription.closed:
+            self._forget(subscription)
+            return
+        subscription.task = self.loop.create_task(subscription.run())
+
+    def _forget(self, subscription):
+        with self._lock:
+            self.subscriptions.discard(subscription)
+
+    def active_count(self):
+        with self._lock:
+            return len(self.subscriptions)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_ws_manager():
+    """Return the process-wide WebSocketManager, starting it on first use"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = WebSocketManager()
+                WS_CONNECTIONS.set_function(_manager.active_count)
+    return _manager